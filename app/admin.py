@@ -1,8 +1,19 @@
 from django.contrib import admin
-from .models import User, Task, Notice, Activity
+from .models import User, Task, Notice, Activity, Job
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ["title", "stage", "priority", "is_trashed", "created_at"]
+    list_filter = ["stage", "priority", "is_trashed"]
+
+    def get_queryset(self, request):
+        # The default manager hides trashed tasks; the admin should see all.
+        return Task.all_objects.all()
+
 
 # Register your models here.
 admin.site.register(User)
-admin.site.register(Task)
+admin.site.register(Task, TaskAdmin)
 admin.site.register(Notice)
 admin.site.register(Activity)
+admin.site.register(Job)
@@ -0,0 +1,223 @@
+# async_views.py
+"""
+Native async implementations of the read-heavy endpoints. Under the uvicorn
+worker these run on the event loop and use Django's async ORM, instead of
+holding a thread per request like the DRF views in ``views.py``.
+"""
+
+import functools
+from asgiref.sync import sync_to_async
+from django.db.models import Count
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from .cache import acached, task_scope
+from .directory import load_task_people
+from .models import Task
+from .pagination import InvalidCursor
+from .renderers import render_response
+from .serializers import NoticeSerializer, TeamSerializer, task_data
+from . import views
+
+
+async def authenticate(request):
+    # Honour DRF's APIClient.force_authenticate() in tests.
+    forced_user = getattr(request, "_force_auth_user", None)
+    if forced_user is not None:
+        return forced_user
+
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        authenticator = authentication_class()
+        user_auth = await authenticator.aauthenticate(request)
+        if user_auth is not None:
+            return user_auth[0]
+    return None
+
+
+def async_api_view(view):
+    """
+    Authenticate an async view with the configured ``aauthenticate`` methods
+    and require an authenticated user, answering like DRF's ``IsAuthenticated``.
+    """
+
+    @csrf_exempt
+    @functools.wraps(view)
+    async def wrapped_view(request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+        except AuthenticationFailed as e:
+            return render_response(
+                {"detail": e.detail},
+                status=status.HTTP_401_UNAUTHORIZED,
+                headers={"WWW-Authenticate": "Token"},
+            )
+        if user is None:
+            return render_response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+                headers={"WWW-Authenticate": "Token"},
+            )
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return wrapped_view
+
+
+@async_api_view
+async def get_team_list(request):
+    if request.method != "GET":
+        return await sync_to_async(views.get_team_list)(request)
+
+    search = request.GET.get("search")
+
+    async def team_data():
+        users = [user async for user in views.team_list_queryset(search)]
+        return TeamSerializer(users, many=True).data
+
+    return render_response(await acached("team_list", [search], ["team"], team_data))
+
+
+@async_api_view
+async def get_team_directory(request):
+    if request.method != "GET":
+        return await sync_to_async(views.get_team_directory)(request)
+
+    try:
+        users, limit = views.team_directory_queryset(request.GET)
+    except InvalidCursor as e:
+        return render_response(
+            {"status": False, "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    async def directory_data():
+        return views.team_directory_data([user async for user in users], limit)
+
+    return render_response(
+        await acached(
+            "team_directory",
+            [request.GET.get("search"), request.GET.get("cursor"), limit],
+            ["team"],
+            directory_data,
+        )
+    )
+
+
+@async_api_view
+async def get_team_typeahead(request):
+    if request.method != "GET":
+        return await sync_to_async(views.get_team_typeahead)(request)
+
+    prefix, limit = views.team_typeahead_params(request.GET)
+
+    async def typeahead_data():
+        users = views.team_typeahead_queryset(prefix, limit)
+        return views.team_typeahead_data([user async for user in users])
+
+    return render_response(
+        await acached("team_typeahead", [prefix, limit], ["team"], typeahead_data)
+    )
+
+
+@async_api_view
+async def get_notifications_list(request):
+    if request.method != "GET":
+        return await sync_to_async(views.get_notifications_list)(request)
+
+    notices = [notice async for notice in views.notifications_queryset(request.user)]
+    serializer = NoticeSerializer(notices, many=True)
+    return render_response(serializer.data)
+
+
+@async_api_view
+async def get_tasks(request):
+    if request.method != "GET":
+        return await sync_to_async(views.get_tasks)(request)
+
+    tasks = [task async for task in views.task_list_queryset(request.user, request.GET)]
+    await sync_to_async(load_task_people)(tasks)
+    tasks_data = [task_data(task) for task in tasks]
+    return render_response({"status": True, "tasks": tasks_data})
+
+
+@async_api_view
+async def get_or_trash_task(request, id):
+    if request.method != "GET":
+        # Trashing stays on the DRF view.
+        return await sync_to_async(views.get_or_trash_task)(request, id)
+
+    async def task_detail_data():
+        task = await Task.all_objects.prefetch_related("activities").aget(id=id)
+        await sync_to_async(load_task_people)([task])
+        return task_data(task, include_activity_dates=False)
+
+    try:
+        task_payload = await acached(
+            "task", [id], [task_scope(id), "team"], task_detail_data
+        )
+    except Task.DoesNotExist:
+        return render_response(
+            {"status": False, "message": "Task not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    return render_response({"status": True, "task": task_payload})
+
+
+async def dashboard_summary(user):
+    all_tasks = views.dashboard_tasks_queryset(user)
+
+    grouped_tasks = {
+        task["stage"]: task["count"]
+        async for task in all_tasks.values("stage")
+        .annotate(count=Count("stage"))
+        .order_by("stage")
+    }
+    graph_data = [
+        {"name": data["priority"], "total": data["total"]}
+        async for data in all_tasks.values("priority")
+        .annotate(total=Count("priority"))
+        .order_by("priority")
+    ]
+    total_tasks = await all_tasks.acount()
+    last_10_tasks = [
+        task async for task in all_tasks.prefetch_related("activities")[:10]
+    ]
+    await sync_to_async(load_task_people)(last_10_tasks)
+    last_10_tasks_data = [task_data(task) for task in last_10_tasks]
+    users_data = []
+    if user.is_superuser:
+        users_data = [
+            views.dashboard_user_data(active_user)
+            async for active_user in views.dashboard_users_queryset()
+        ]
+
+    return {
+        "totalTasks": total_tasks,
+        "last10Task": last_10_tasks_data,
+        "users": users_data,
+        "tasks": grouped_tasks,
+        "graphData": graph_data,
+    }
+
+
+@async_api_view
+async def dashboard_statistics(request):
+    if request.method != "GET":
+        return await sync_to_async(views.dashboard_statistics)(request)
+
+    try:
+        summary = await acached(
+            "dashboard",
+            [request.user.id],
+            ["tasks", "team"],
+            lambda: dashboard_summary(request.user),
+        )
+
+        return render_response({"status": True, **summary, "message": "Successfully."})
+    except Exception as error:
+        return render_response(
+            {"status": False, "message": str(error)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
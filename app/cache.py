@@ -0,0 +1,93 @@
+"""
+Versioned cache for the read endpoints.
+
+Every cached value is stored under a key that includes the current version of
+each scope it depends on: "team" for anything showing users, "tasks" for
+anything listing tasks and "task:<id>" for a single task. A write bumps the
+versions of the scopes it touches, which orphans every key built on them in
+one cache write; the orphaned entries simply expire. Bumps run on commit, so a
+reader never caches data from before the write under the new version.
+"""
+
+import hashlib
+import secrets
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .routers import use_primary
+
+VERSION_KEY_PREFIX = "api-version:"
+VALUE_KEY_PREFIX = "api:"
+
+
+def task_scope(task_id):
+    return f"task:{task_id}"
+
+
+def new_version():
+    # Random rather than incremented, so two racing bumps can't both write the
+    # same new version.
+    return secrets.token_hex(8)
+
+
+def scope_versions(scopes):
+    version_keys = [VERSION_KEY_PREFIX + scope for scope in scopes]
+    versions = cache.get_many(version_keys)
+    for version_key in version_keys:
+        if version_key not in versions:
+            cache.add(version_key, new_version(), timeout=None)
+            versions[version_key] = cache.get(version_key)
+    return [versions[version_key] for version_key in version_keys]
+
+
+def bump(*scopes):
+    """
+    Invalidate everything cached under ``scopes`` once the current
+    transaction commits.
+    """
+
+    def bump_versions():
+        cache.set_many(
+            {VERSION_KEY_PREFIX + scope: new_version() for scope in scopes},
+            timeout=None,
+        )
+
+    transaction.on_commit(bump_versions)
+
+
+def cache_key(name, parts, versions):
+    digest = hashlib.md5(
+        repr((tuple(parts), tuple(versions))).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"{VALUE_KEY_PREFIX}{name}:{digest}"
+
+
+def cached(name, parts, scopes, build):
+    """
+    Return the value cached for ``name`` and ``parts`` at the current
+    versions of ``scopes``, calling ``build`` to compute and cache it on a
+    miss. ``build`` reads from the primary, so a lagging replica can't fill
+    the cache with data older than the versions it is stored under.
+    """
+    key = cache_key(name, parts, scope_versions(scopes))
+    value = cache.get(key)
+    if value is None:
+        use_primary()
+        value = build()
+        cache.set(key, value, settings.API_CACHE_TIMEOUT)
+    return value
+
+
+async def acached(name, parts, scopes, build):
+    """
+    Async counterpart of ``cached`` for an async ``build``.
+    """
+    versions = await sync_to_async(scope_versions)(scopes)
+    key = cache_key(name, parts, versions)
+    value = await cache.aget(key)
+    if value is None:
+        use_primary()
+        value = await build()
+        await cache.aset(key, value, settings.API_CACHE_TIMEOUT)
+    return value
@@ -0,0 +1,21 @@
+import time
+from django.db.backends.postgresql import base
+from app.metrics import DB_CONNECTION_ACQUIRE_SECONDS
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that records how long it takes to get a connection,
+    whether from the pool or from a fresh connect and TLS handshake.
+    """
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            DB_CONNECTION_ACQUIRE_SECONDS.observe(
+                time.perf_counter() - start,
+                alias=self.alias,
+                pooled=self.pool is not None,
+            )
@@ -0,0 +1,130 @@
+"""
+Per-worker directory of the people shown in task payloads.
+
+Task payloads only need a member's name, title, role and email, and an
+activity author's name. Rather than joining ``User`` rows into every task
+query, each worker keeps a compact id -> record snapshot of all users and
+resolves people from it. The snapshot refreshes incrementally: each refresh
+only reads the users saved since the newest change it has already seen, so in
+steady state it is one indexed query that returns nothing. Saves and deletes
+in this worker update it as soon as they commit (see app/signals.py); other
+workers pick up saves on their next refresh. A user deleted by another worker
+lingers in its snapshot, but nothing references a deleted user any more.
+"""
+
+import threading
+from datetime import timedelta
+from .models import Task, User
+
+# Every refresh re-reads the users saved this long before the newest change
+# already seen, so a save whose transaction commits late isn't skipped.
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+RECORD_FIELDS = ("id", "name", "title", "role", "email")
+
+# Shown for an activity author the directory doesn't know, e.g. one being
+# purged while the payload is built.
+UNKNOWN_USER_NAME = "Unknown user"
+
+
+class UserRecord:
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, id, name, title, role, email):
+        self.id = id
+        self.name = name
+        self.title = title
+        self.role = role
+        self.email = email
+
+
+class UserDirectory:
+    def __init__(self):
+        self._records = {}
+        self._synced_until = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, user_id):
+        return self._records.get(user_id)
+
+    def name(self, user_id):
+        record = self._records.get(user_id)
+        return record.name if record is not None else UNKNOWN_USER_NAME
+
+    def get_many(self, user_ids):
+        records = self._records
+        return [records[user_id] for user_id in user_ids if user_id in records]
+
+    def put(self, user):
+        self._records[user.id] = UserRecord(*(getattr(user, f) for f in RECORD_FIELDS))
+
+    def forget(self, user_id):
+        self._records.pop(user_id, None)
+
+    def refresh(self):
+        """
+        Load the users saved since the last refresh. The first refresh loads
+        every user.
+        """
+        with self._lock:
+            users = User.objects.values_list(*RECORD_FIELDS, "updated_at")
+            if self._synced_until is not None:
+                users = users.filter(
+                    updated_at__gte=self._synced_until - REFRESH_OVERLAP
+                )
+            self._load(users)
+
+    def ensure(self, user_ids):
+        """
+        Refresh, then load any of ``user_ids`` the refresh didn't cover.
+        """
+        self.refresh()
+        missing = [user_id for user_id in user_ids if user_id not in self._records]
+        if missing:
+            with self._lock:
+                self._load(
+                    User.objects.filter(id__in=missing).values_list(
+                        *RECORD_FIELDS, "updated_at"
+                    )
+                )
+
+    def _load(self, rows):
+        records = self._records
+        synced_until = self._synced_until
+        for *fields, updated_at in rows:
+            records[fields[0]] = UserRecord(*fields)
+            if synced_until is None or updated_at > synced_until:
+                synced_until = updated_at
+        self._synced_until = synced_until
+
+
+user_directory = UserDirectory()
+
+
+def load_task_people(tasks):
+    """
+    Set ``team_ids`` on each task and make sure ``user_directory`` knows every
+    team member and activity author, in one query plus the refresh.
+    ``task_data`` needs this; fetch the tasks with
+    ``prefetch_related("activities")``.
+    """
+    tasks = list(tasks)
+    team_ids = {task.id: [] for task in tasks}
+    memberships = (
+        Task.team.through.objects.filter(task_id__in=team_ids)
+        .order_by("id")
+        .values_list("task_id", "user_id")
+    )
+    for task_id, user_id in memberships:
+        team_ids[task_id].append(user_id)
+
+    user_ids = set()
+    for task in tasks:
+        task.team_ids = team_ids[task.id]
+        user_ids.update(task.team_ids)
+        user_ids.update(activity.by_id for activity in task.activities.all())
+    user_directory.ensure(user_ids)
+    return tasks
@@ -0,0 +1,179 @@
+"""
+Streaming export of tasks with their team, subtasks and activities.
+
+Tasks are read in ``(created_at, id)`` order through ``QuerySet.iterator``,
+which uses a server-side cursor on PostgreSQL, and are encoded one chunk at a
+time, so memory stays flat however many tasks are exported. An interrupted
+export resumes with ``after``, the id of the last task received.
+
+The chunks come from a sync generator. Under ASGI, Django would read a sync
+streaming response into a list before sending it, so
+``app.middleware.CompressionMiddleware`` hands it to the server as an async
+iterator that pulls one chunk at a time; keep that middleware in MIDDLEWARE.
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime
+from itertools import islice
+import orjson
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .directory import load_task_people, user_directory
+from .models import Task
+
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+CSV_COLUMNS = [
+    "id",
+    "title",
+    "stage",
+    "priority",
+    "date",
+    "team",
+    "sub_tasks",
+    "assets",
+    "activities",
+    "is_trashed",
+    "created_at",
+    "updated_at",
+]
+
+
+def parse_export_datetime(value):
+    """
+    An ISO date or datetime, in the current time zone unless it has one.
+    """
+    parsed = datetime.fromisoformat(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(start=None, end=None, after=None):
+    """
+    Tasks created in ``[start, end)``, trashed ones included, following the
+    task ``after`` when resuming.
+    """
+    tasks = Task.all_objects.order_by("created_at", "id")
+    if start:
+        tasks = tasks.filter(created_at__gte=start)
+    if end:
+        tasks = tasks.filter(created_at__lt=end)
+    if after:
+        last_created_at = Task.all_objects.values_list("created_at", flat=True).get(
+            id=after
+        )
+        tasks = tasks.filter(
+            Q(created_at__gt=last_created_at)
+            | Q(created_at=last_created_at, id__gt=after)
+        )
+    return tasks.prefetch_related("activities")
+
+
+def task_chunks(tasks, chunk_size):
+    # With a chunk size, iterator() prefetches each chunk's activities.
+    iterator = tasks.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield load_task_people(chunk)
+
+
+def export_record(task):
+    return {
+        "id": task.id,
+        "title": task.title,
+        "stage": task.stage,
+        "priority": task.priority,
+        "date": task.date,
+        "team": [
+            {"id": member.id, "name": member.name, "email": member.email}
+            for member in user_directory.get_many(task.team_ids)
+        ],
+        "subTasks": task.sub_tasks,
+        "assets": task.assets,
+        "activities": [
+            {
+                "id": activity.id,
+                "type": activity.type,
+                "activity": activity.activity,
+                "by": user_directory.name(activity.by_id),
+                "byId": activity.by_id,
+                "date": activity.created_at,
+            }
+            for activity in task.activities.all()
+        ],
+        "isTrashed": task.is_trashed,
+        "createdAt": task.created_at,
+        "updatedAt": task.updated_at,
+    }
+
+
+def dumps(value):
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+
+
+def ndjson_chunks(tasks, chunk_size):
+    for chunk in task_chunks(tasks, chunk_size):
+        yield b"".join(dumps(export_record(task)) + b"\n" for task in chunk)
+
+
+def csv_chunks(tasks, chunk_size):
+    """
+    One row per task. The team is a ``;``-separated list of emails, and
+    subtasks, assets and activities are JSON arrays.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for chunk in task_chunks(tasks, chunk_size):
+        for task in chunk:
+            record = export_record(task)
+            writer.writerow(
+                [
+                    record["id"],
+                    record["title"],
+                    record["stage"],
+                    record["priority"],
+                    record["date"].isoformat(),
+                    ";".join(member["email"] for member in record["team"]),
+                    dumps(record["subTasks"]).decode(),
+                    dumps(record["assets"]).decode(),
+                    dumps(record["activities"]).decode(),
+                    record["isTrashed"],
+                    record["createdAt"].isoformat(),
+                    record["updatedAt"].isoformat(),
+                ]
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # No tasks: only the header was written.
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(export_format, tasks, chunk_size=None, compress=False):
+    """
+    The export of ``tasks`` as ``export_format``, "csv" or "ndjson", in
+    byte chunks of ``chunk_size`` tasks, gzipped when ``compress`` is set.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    encode = csv_chunks if export_format == "csv" else ndjson_chunks
+    chunks = encode(tasks, chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
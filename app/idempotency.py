@@ -0,0 +1,175 @@
+"""
+``Idempotency-Key`` support for the endpoints that create tasks and
+activities, which mobile clients retry on flaky networks.
+
+The first request with a key claims it by inserting an ``IdempotencyKey``
+row, runs the view and stores the response on the row in the view's own
+transaction. A retry with the same key and request gets the stored response
+back without running the view; a retry while the first request is still in
+flight gets a 409, and reusing a key for a different request a 422. Only
+successes and 404s are stored; any other outcome may not repeat (the views
+turn unexpected errors, transient ones included, into 400s), so it releases
+the key for the retry to run the view again.
+
+Keys expire after ``IDEMPOTENCY_KEY_TTL`` seconds. A claim expires after
+``IDEMPOTENCY_LOCK_TIMEOUT`` seconds, so a request that never finished
+doesn't hold its key forever; while the view runs, a heartbeat thread keeps
+pushing that expiry back, so a slow request can't be claimed a second time.
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+from functools import wraps
+import orjson
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+from .renderers import ORJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+
+# Client errors a retry of the same request would get again.
+REPLAYED_CLIENT_ERRORS = {status.HTTP_404_NOT_FOUND}
+
+
+def is_replayable(status_code):
+    return status.is_success(status_code) or status_code in REPLAYED_CLIENT_ERRORS
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.body):
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def lock_expiry():
+    return timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Insert the row for ``key`` and return it with ``True``, or return the
+    live row already there with ``False``. An expired row is deleted and the
+    key claimed afresh.
+    """
+    now = timezone.now()
+    while True:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=lock_expiry(),
+                )
+            return record, True
+        except IntegrityError:
+            pass
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is not None and record.expires_at > now:
+            return record, False
+        IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+
+
+def hold_claim(record_id, done):
+    """
+    Push back the expiry of an in-flight claim every third of the lock
+    timeout until ``done`` is set.
+    """
+    try:
+        while not done.wait(settings.IDEMPOTENCY_LOCK_TIMEOUT / 3):
+            try:
+                IdempotencyKey.objects.filter(
+                    id=record_id, response_status__isnull=True
+                ).update(expires_at=lock_expiry())
+            except DatabaseError:
+                logger.warning("Could not extend Idempotency-Key claim %s", record_id)
+    finally:
+        connection.close()
+
+
+def replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {
+                "status": False,
+                "message": "This Idempotency-Key was used for a different request.",
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.response_status is None:
+        return Response(
+            {
+                "status": False,
+                "message": "A request with this Idempotency-Key is in progress.",
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+    return Response(
+        record.response_data,
+        status=record.response_status,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def idempotent(view):
+    """
+    Make a DRF function view honour the ``Idempotency-Key`` header. Goes
+    below ``@api_view`` so ``request.user`` is authenticated. Requests
+    without the header, or from anonymous users, run as usual.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {
+                    "status": False,
+                    "message": f"Idempotency-Key can't be longer than {MAX_KEY_LENGTH} characters.",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim_key(request.user, key, fingerprint)
+        if not claimed:
+            return replay(record, fingerprint)
+
+        done = threading.Event()
+        threading.Thread(target=hold_claim, args=(record.id, done), daemon=True).start()
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if is_replayable(response.status_code):
+                    # Stored as it renders, so a replay is byte-for-byte the
+                    # same.
+                    data = orjson.loads(ORJSONRenderer().render(response.data))
+                    IdempotencyKey.objects.filter(id=record.id).update(
+                        response_status=response.status_code,
+                        response_data=data,
+                        expires_at=timezone.now()
+                        + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    )
+        except Exception:
+            IdempotencyKey.objects.filter(id=record.id).delete()
+            raise
+        finally:
+            done.set()
+        if not is_replayable(response.status_code):
+            IdempotencyKey.objects.filter(id=record.id).delete()
+        return response
+
+    return wrapper
@@ -0,0 +1,43 @@
+import secrets
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7(timestamp_ms=None):
+    """
+    Generate a time-ordered UUID (RFC 9562 version 7).
+
+    The first 48 bits hold the Unix timestamp in milliseconds, so ids sort in
+    creation order and new rows land at the right-hand edge of the primary key
+    index. Within a millisecond a 12-bit counter keeps ids from this process
+    increasing. Pass ``timestamp_ms`` to build an id for an existing timestamp.
+    """
+    global _last_ms, _counter
+
+    if timestamp_ms is None:
+        with _lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > _last_ms:
+                _last_ms = now_ms
+                # Start low in the counter space to leave room for increments.
+                _counter = secrets.randbits(11)
+            else:
+                _counter += 1
+                if _counter > 0xFFF:
+                    _last_ms += 1
+                    _counter = 0
+            timestamp_ms, counter = _last_ms, _counter
+    else:
+        counter = secrets.randbits(12)
+
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= secrets.randbits(62)
+    return uuid.UUID(int=value)
@@ -0,0 +1,364 @@
+"""
+Bulk import of tasks from CSV or NDJSON, in the shapes app.exports writes.
+
+Rows are parsed as a stream and handled a chunk at a time: the chunk's team
+members and activity authors are resolved with one lookup, invalid rows are
+reported and skipped, and the rest are inserted with ``bulk_create`` in one
+transaction per chunk: tasks, activities, notices and their through rows.
+Imported tasks get new ids.
+"""
+
+import codecs
+import csv
+import re
+import time
+import uuid
+from datetime import datetime
+from itertools import islice
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .cache import bump
+from .ids import uuid7
+from .models import Activity, Notice, Task, User
+from .rollups import created_counts, record_task_events
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+TITLE_MAX_LENGTH = Task._meta.get_field("title").max_length
+
+# CSV files are decoded with surrogateescape, which turns bytes that aren't
+# UTF-8 into lone surrogates, so the rows holding them can be reported and the
+# rest of the file still read.
+UNDECODABLE = re.compile("[\udc80-\udcff]")
+
+# Only the first errors are kept for the report; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "message": message})
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rowsPerSecond": round(self.rows / self.seconds, 1) if self.seconds else 0,
+        }
+
+
+def csv_records(lines):
+    """
+    Records from the CSV export's columns. The team is a ``;``-separated
+    list of emails or ids; subtasks, assets and activities are JSON arrays.
+    """
+    rows = csv.DictReader(
+        codecs.iterdecode(lines, "utf-8-sig", errors="surrogateescape")
+    )
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield ImportRowError(f"Invalid CSV: {e}")
+            continue
+        if any(UNDECODABLE.search(value) for value in row.values() if value):
+            yield ImportRowError("Invalid UTF-8.")
+            continue
+        try:
+            yield {
+                "title": row.get("title"),
+                "stage": row.get("stage"),
+                "priority": row.get("priority"),
+                "date": row.get("date"),
+                "team": [ref for ref in (row.get("team") or "").split(";") if ref],
+                "subTasks": orjson.loads(row.get("sub_tasks") or "[]"),
+                "assets": orjson.loads(row.get("assets") or "[]"),
+                "activities": orjson.loads(row.get("activities") or "[]"),
+            }
+        except orjson.JSONDecodeError as e:
+            yield ImportRowError(f"Invalid JSON: {e}")
+
+
+def ndjson_records(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield ImportRowError(f"Invalid JSON: {e}")
+            continue
+        yield (
+            record
+            if isinstance(record, dict)
+            else ImportRowError("Expected a JSON object.")
+        )
+
+
+def member_ref(member):
+    # The CSV and hand-written files list ids or emails, the NDJSON export
+    # lists objects.
+    if isinstance(member, dict):
+        return member.get("id") or member.get("email")
+    return member
+
+
+def user_refs(record):
+    """
+    The team member and activity author references in ``record``, ids or
+    emails.
+    """
+    team = record.get("team")
+    activities = record.get("activities")
+    refs = [member_ref(member) for member in team] if isinstance(team, list) else []
+    if isinstance(activities, list):
+        for activity in activities:
+            if isinstance(activity, dict):
+                refs.append(activity.get("byId") or activity.get("byEmail"))
+    return [normalize_ref(ref) for ref in refs if ref]
+
+
+def normalize_ref(ref):
+    ref = str(ref).strip()
+    try:
+        return str(uuid.UUID(ref))
+    except ValueError:
+        return ref
+
+
+def choice(field_name, value, default):
+    value = str(value or default).lower()
+    choices = [key for key, _ in Task._meta.get_field(field_name).choices]
+    if value not in choices:
+        raise ImportRowError(f"Invalid {field_name} '{value}'.")
+    return value
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"Invalid date '{value}'.")
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def json_list(record, key):
+    value = record.get(key) or []
+    if not isinstance(value, list):
+        raise ImportRowError(f"'{key}' must be a list.")
+    return value
+
+
+class TaskImporter:
+    """
+    Imports records for ``user``, who authors the "assigned" activity of
+    tasks without activities. With ``notify`` off, no notices are created.
+    """
+
+    def __init__(self, user, notify=True, chunk_size=None):
+        self.user = user
+        self.notify = notify
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.report = ImportReport()
+        # Team members and authors resolved so far, by id and by email.
+        self.user_ids = {}
+
+    def run(self, records):
+        records = enumerate(records, start=1)
+        while chunk := list(islice(records, self.chunk_size)):
+            self.import_chunk(chunk)
+        return self.report.finish()
+
+    def resolve_users(self, records):
+        refs = {
+            ref
+            for _, record in records
+            if isinstance(record, dict)
+            for ref in user_refs(record)
+            if ref not in self.user_ids
+        }
+        if not refs:
+            return
+        ids, emails = [], []
+        for ref in refs:
+            try:
+                ids.append(uuid.UUID(ref))
+            except ValueError:
+                emails.append(ref)
+        for user_id, email in User.objects.filter(
+            Q(id__in=ids) | Q(email__in=emails)
+        ).values_list("id", "email"):
+            self.user_ids[str(user_id)] = user_id
+            self.user_ids[email] = user_id
+
+    def user_id(self, ref):
+        user_id = self.user_ids.get(normalize_ref(ref)) if ref else None
+        if user_id is None:
+            raise ImportRowError(f"User '{ref}' does not exist.")
+        return user_id
+
+    def build(self, record):
+        """
+        The task, team ids and activities of one record.
+        """
+        title = str(record.get("title") or "").strip()
+        if not title:
+            raise ImportRowError("A title is required.")
+        if len(title) > TITLE_MAX_LENGTH:
+            raise ImportRowError(
+                f"The title is longer than {TITLE_MAX_LENGTH} characters."
+            )
+        task = Task(
+            id=uuid7(),
+            title=title,
+            stage=choice("stage", record.get("stage"), "todo"),
+            priority=choice("priority", record.get("priority"), "normal"),
+            date=parse_date(record.get("date")),
+            sub_tasks=json_list(record, "subTasks"),
+            assets=json_list(record, "assets"),
+        )
+        team_ids = list(
+            dict.fromkeys(
+                self.user_id(member_ref(member)) for member in json_list(record, "team")
+            )
+        )
+
+        activities = []
+        for data in json_list(record, "activities"):
+            if not isinstance(data, dict):
+                raise ImportRowError("Activities must be objects.")
+            author = data.get("byId") or data.get("byEmail")
+            activities.append(
+                Activity(
+                    id=uuid7(),
+                    type=self.activity_type(data.get("type")),
+                    activity=data.get("activity") or "",
+                    date=parse_date(data.get("date")),
+                    by_id=self.user_id(author) if author else self.user.id,
+                )
+            )
+        if not activities:
+            activities.append(
+                Activity(
+                    id=uuid7(),
+                    type="assigned",
+                    activity="New task has been assigned to you.",
+                    by_id=self.user.id,
+                )
+            )
+        return task, team_ids, activities
+
+    def activity_type(self, value):
+        value = str(value or "commented").lower()
+        if value not in dict(Activity._meta.get_field("type").choices):
+            raise ImportRowError(f"Invalid activity type '{value}'.")
+        return value
+
+    def import_chunk(self, chunk):
+        self.resolve_users(chunk)
+
+        tasks, team_rows, activities, activity_rows = [], [], [], []
+        for row_number, record in chunk:
+            self.report.rows += 1
+            try:
+                if isinstance(record, ImportRowError):
+                    raise record
+                task, team_ids, task_activities = self.build(record)
+            except ImportRowError as e:
+                self.report.add_error(row_number, str(e))
+                continue
+            except (AttributeError, TypeError, ValueError) as e:
+                # A value of an unexpected type that build() doesn't check.
+                self.report.add_error(row_number, f"Invalid row: {e}")
+                continue
+            tasks.append(task)
+            team_rows.extend((task.id, user_id) for user_id in team_ids)
+            activities.extend(task_activities)
+            activity_rows.extend((task.id, activity.id) for activity in task_activities)
+
+        if not tasks:
+            return
+        TaskTeam = Task.team.through
+        TaskActivity = Task.activities.through
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            Activity.objects.bulk_create(activities)
+            TaskActivity.objects.bulk_create(
+                [
+                    TaskActivity(task_id=task_id, activity_id=activity_id)
+                    for task_id, activity_id in activity_rows
+                ]
+            )
+            TaskTeam.objects.bulk_create(
+                [
+                    TaskTeam(task_id=task_id, user_id=user_id)
+                    for task_id, user_id in team_rows
+                ]
+            )
+            if self.notify:
+                self.create_notices(tasks, team_rows)
+
+            by_counts = {}
+            for task in tasks:
+                by_counts.setdefault((task.stage, task.priority), []).append(task.id)
+            for (stage, priority), task_ids in by_counts.items():
+                record_task_events(task_ids, created_counts(stage, priority))
+            bump("tasks")
+        self.report.imported += len(tasks)
+
+    def create_notices(self, tasks, team_rows):
+        team_ids = {}
+        for task_id, user_id in team_rows:
+            team_ids.setdefault(task_id, []).append(user_id)
+        notices = [
+            Notice(id=uuid7(), text="New task has been assigned to you.", task=task)
+            for task in tasks
+            if task.id in team_ids
+        ]
+        Notice.objects.bulk_create(notices)
+        NoticeTeam = Notice.team.through
+        NoticeTeam.objects.bulk_create(
+            [
+                NoticeTeam(notice_id=notice.id, user_id=user_id)
+                for notice in notices
+                for user_id in team_ids[notice.task_id]
+            ]
+        )
+
+
+def import_tasks(import_format, lines, user, notify=True, chunk_size=None):
+    """
+    Import ``lines``, an iterable of byte lines in ``import_format``, and
+    return the ``ImportReport``.
+    """
+    parse = csv_records if import_format == "csv" else ndjson_records
+    importer = TaskImporter(user, notify=notify, chunk_size=chunk_size)
+    return importer.run(parse(lines))
@@ -0,0 +1,264 @@
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .cache import bump, task_scope
+from .models import (
+    Activity,
+    IdempotencyKey,
+    Job,
+    Notice,
+    Task,
+    TaskDailyRollup,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue_job(kind, created_by=None, **params):
+    """
+    Record a job and start it on a background thread once the surrounding
+    transaction commits. Jobs left pending (e.g. by a worker restart) are
+    picked up by the ``run_jobs`` management command. If the same job is
+    already pending or running, that job is returned instead, unless it is a
+    running job whose worker has died; that one is failed and replaced.
+    """
+    while True:
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(
+                    kind=kind, params=params, created_by=created_by
+                )
+        except IntegrityError:
+            if fail_stale_jobs(kind=kind, params=params):
+                continue
+            job = Job.objects.filter(
+                kind=kind, params=params, status__in=["pending", "running"]
+            ).first()
+            if job is not None:
+                return job
+            # It finished in the meantime; try again.
+            continue
+        transaction.on_commit(lambda: start_job_thread(job.id))
+        return job
+
+
+def stale_before():
+    """
+    Running jobs last seen before this have lost their worker: a live one
+    touches ``updated_at`` every third of ``JOB_HEARTBEAT_TIMEOUT``.
+    """
+    return timezone.now() - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT)
+
+
+def fail_stale_jobs(**filters):
+    now = timezone.now()
+    return Job.objects.filter(
+        status="running", updated_at__lt=stale_before(), **filters
+    ).update(
+        status="failed",
+        error="The worker running this job stopped.",
+        finished_at=now,
+        updated_at=now,
+    )
+
+
+def heartbeat(job_id, done):
+    """
+    Touch a running job's ``updated_at`` every third of the heartbeat
+    timeout until ``done`` is set, so it isn't taken for a dead one.
+    """
+    try:
+        while not done.wait(settings.JOB_HEARTBEAT_TIMEOUT / 3):
+            try:
+                Job.objects.filter(id=job_id, status="running").update(
+                    updated_at=timezone.now()
+                )
+            except DatabaseError:
+                logger.warning("Could not record the heartbeat of job %s", job_id)
+    finally:
+        connection.close()
+
+
+def start_job_thread(job_id):
+    thread = threading.Thread(
+        target=run_job, args=(job_id,), name=f"job-{job_id}", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def run_job(job_id):
+    claimed = Job.objects.filter(id=job_id, status="pending").update(
+        status="running", started_at=timezone.now(), updated_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    job = Job.objects.get(id=job_id)
+    done = threading.Event()
+    threading.Thread(target=heartbeat, args=(job_id, done), daemon=True).start()
+    try:
+        JOB_HANDLERS[job.kind](job)
+        job.refresh_from_db()
+        Job.objects.filter(id=job_id, status="running").update(
+            status="completed", finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        elapsed = (timezone.now() - job.started_at).total_seconds()
+        logger.info(
+            "Job %s (%s) processed %d rows in %.2fs (%.0f rows/s)",
+            job.id,
+            job.kind,
+            job.processed,
+            elapsed,
+            job.processed / elapsed if elapsed else 0,
+        )
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.id, job.kind)
+        Job.objects.filter(id=job_id, status="running").update(
+            status="failed",
+            error=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+    finally:
+        done.set()
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def report_progress(job, processed):
+    Job.objects.filter(id=job.id).update(
+        processed=F("processed") + processed, updated_at=timezone.now()
+    )
+
+
+def job_metrics(job):
+    """
+    Progress and throughput figures for the job status endpoint.
+    """
+    end = job.finished_at or timezone.now()
+    elapsed = (end - job.started_at).total_seconds() if job.started_at else 0
+    return {
+        "processed": job.processed,
+        "total": job.total,
+        "percent": round(job.processed * 100 / job.total, 1) if job.total else 100.0,
+        "elapsedSeconds": round(elapsed, 3),
+        "rowsPerSecond": round(job.processed / elapsed, 1) if elapsed else 0,
+    }
+
+
+def delete_in_batches(job, queryset, batch_size, before_delete=None):
+    """
+    Delete ``queryset`` a batch of primary keys at a time, so the deletion
+    collector only ever holds one batch of rows and their dependents in
+    memory, and each batch commits in its own short transaction. Each batch
+    is locked and re-checked against ``queryset`` in that transaction, so a
+    row that stopped matching (e.g. a restored task) is left alone.
+    ``before_delete`` is called with the keys about to be deleted.
+    """
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            locked = queryset.filter(pk__in=ids).select_for_update()
+            ids = list(locked.values_list("pk", flat=True))
+            if before_delete and ids:
+                before_delete(ids)
+            queryset.filter(pk__in=ids).delete()
+        report_progress(job, len(ids))
+
+
+@job_handler("purge_trashed_tasks")
+def purge_trashed_tasks(job):
+    # app.sync imports the serializers, which import this module.
+    from .sync import record_tombstones
+
+    def before_delete(task_ids):
+        record_tombstones(task_ids)
+        # Tasks have no post_delete receiver, so the collector can fast-delete
+        # them; the batch's cache scopes are bumped here in one go.
+        bump("tasks", *(task_scope(task_id) for task_id in task_ids))
+
+    batch_size = job.params.get("batch_size", settings.JOB_BATCH_SIZE)
+    Job.objects.filter(id=job.id).update(total=Task.trashed.count())
+    delete_in_batches(job, Task.trashed.all(), batch_size, before_delete=before_delete)
+
+
+def user_dependents(user_id):
+    """
+    Everything that cascades from deleting a user, in the order the purge
+    deletes it: the user's activities (with their task links) first, then
+    the rows linking the user to tasks and notices, then their task
+    rollups, idempotency keys and auth token.
+    """
+    return [
+        Activity.objects.filter(by_id=user_id),
+        User.tasks.through.objects.filter(user_id=user_id),
+        Task.team.through.objects.filter(user_id=user_id),
+        Notice.team.through.objects.filter(user_id=user_id),
+        Notice.is_read.through.objects.filter(user_id=user_id),
+        TaskDailyRollup.objects.filter(user_id=user_id),
+        IdempotencyKey.objects.filter(user_id=user_id),
+        Token.objects.filter(user_id=user_id),
+    ]
+
+
+def remove_from_teams(membership_ids):
+    """
+    Before the purge deletes a user's team rows: tombstone them, and mark
+    the tasks changed so the rest of each team syncs the new team.
+    """
+    from .sync import record_removals
+
+    memberships = list(
+        Task.team.through.objects.filter(id__in=membership_ids).values_list(
+            "task_id", "user_id"
+        )
+    )
+    record_removals(memberships)
+    Task.all_objects.filter(id__in={task_id for task_id, _ in memberships}).update(
+        updated_at=timezone.now()
+    )
+
+
+@job_handler("purge_user")
+def purge_user(job):
+    """
+    Delete a deactivated user's dependents in batches, then the user, whose
+    own delete is left with nothing to cascade to.
+    """
+    user_id = job.params["user_id"]
+    batch_size = job.params.get("batch_size", settings.JOB_BATCH_SIZE)
+    dependents = user_dependents(user_id)
+    Job.objects.filter(id=job.id).update(
+        total=sum(queryset.count() for queryset in dependents) + 1
+    )
+
+    for queryset in dependents:
+        before_delete = (
+            remove_from_teams if queryset.model is Task.team.through else None
+        )
+        delete_in_batches(job, queryset, batch_size, before_delete=before_delete)
+        # Cascades and raw through-row deletes send no m2m_changed, and every
+        # payload showing the user's tasks or activities depends on "team".
+        bump("tasks", "team")
+
+    User.objects.filter(id=user_id).delete()
+    report_progress(job, 1)
@@ -0,0 +1,83 @@
+from collections import Counter, defaultdict
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from app.models import Task, TaskDailyRollup
+from app.rollups import PRIORITY_FIELDS, STAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily task rollups from the task table. Tasks keep no "
+        "stage history, so each task's current stage is counted on the day "
+        "it was last updated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Only rebuild the days from this ISO date on.",
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.JOB_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        created = Task.all_objects.annotate(day=TruncDate("created_at"))
+        updated = Task.all_objects.annotate(day=TruncDate("updated_at"))
+        if since:
+            created = created.filter(day__gte=since)
+            updated = updated.filter(day__gte=since)
+
+        priority_counts = {
+            field: Count("id", filter=Q(priority=priority))
+            for priority, field in PRIORITY_FIELDS.items()
+        }
+        stage_counts = {
+            field: Count("id", filter=Q(stage=stage))
+            for stage, field in STAGE_FIELDS.items()
+        }
+
+        counts = defaultdict(Counter)
+        # All tasks per day, then each team member's tasks per day.
+        for group_by, queryset_filter in (
+            (["day"], Q()),
+            (["day", "team"], Q(team__isnull=False)),
+        ):
+            for row in (
+                created.filter(queryset_filter)
+                .values(*group_by)
+                .annotate(created_count=Count("id"), **priority_counts)
+                .order_by()
+            ):
+                key = (row.get("team"), row["day"])
+                counts[key]["created"] += row["created_count"]
+                for field in PRIORITY_FIELDS.values():
+                    counts[key][field] += row[field]
+            for row in (
+                updated.filter(queryset_filter)
+                .values(*group_by)
+                .annotate(**stage_counts)
+                .order_by()
+            ):
+                key = (row.get("team"), row["day"])
+                for field in STAGE_FIELDS.values():
+                    counts[key][field] += row[field]
+
+        rollups = TaskDailyRollup.objects.all()
+        if since:
+            rollups = rollups.filter(day__gte=since)
+        with transaction.atomic():
+            rollups.delete()
+            TaskDailyRollup.objects.bulk_create(
+                [
+                    TaskDailyRollup(user_id=user_id, day=day, **row_counts)
+                    for (user_id, day), row_counts in counts.items()
+                ],
+                batch_size=options["batch_size"],
+            )
+
+        self.stdout.write(f"Rebuilt {len(counts)} rollup rows.")
@@ -0,0 +1,74 @@
+import sys
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from app.exports import (
+    EXPORT_CONTENT_TYPES,
+    export_chunks,
+    export_queryset,
+    parse_export_datetime,
+)
+from app.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream every task with its team, subtasks and activities as CSV or "
+        "NDJSON, to a file or stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(EXPORT_CONTENT_TYPES), default="ndjson"
+        )
+        parser.add_argument("--output", help="File to write; stdout by default.")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output.")
+        parser.add_argument(
+            "--from",
+            dest="start",
+            type=parse_export_datetime,
+            help="Only tasks created at or after this ISO date or datetime.",
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            type=parse_export_datetime,
+            help="Only tasks created before this ISO date or datetime.",
+        )
+        parser.add_argument(
+            "--after",
+            type=uuid.UUID,
+            help="Resume after the task with this id, the last one exported.",
+        )
+        parser.add_argument("--chunk-size", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            tasks = export_queryset(
+                start=options["start"], end=options["end"], after=options["after"]
+            )
+        except Task.DoesNotExist:
+            raise CommandError(f"Task {options['after']} not found.")
+
+        chunks = export_chunks(
+            options["format"],
+            tasks,
+            chunk_size=options["chunk_size"],
+            compress=options["gzip"],
+        )
+        started = time.perf_counter()
+        written = 0
+        output = open(options["output"], "wb") if options["output"] else None
+        try:
+            stream = output or sys.stdout.buffer
+            for chunk in chunks:
+                stream.write(chunk)
+                written += len(chunk)
+            stream.flush()
+        finally:
+            if output:
+                output.close()
+
+        self.stderr.write(
+            f"Exported {written} bytes in {time.perf_counter() - started:.2f}s."
+        )
@@ -0,0 +1,59 @@
+import gzip
+from django.core.management.base import BaseCommand, CommandError
+from app.imports import IMPORT_FORMATS, import_tasks
+from app.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tasks from a CSV or NDJSON file in the export's format, "
+        "e.g. when migrating boards from another tracker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import; .gz files are unzipped.")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="Defaults to the file's extension.",
+        )
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Email of the user the import is done as.",
+        )
+        parser.add_argument(
+            "--no-notify",
+            action="store_true",
+            help="Don't notify the imported teams.",
+        )
+        parser.add_argument("--chunk-size", type=int)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        import_format = options["format"] or path.removesuffix(".gz").rsplit(".")[-1]
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError("Pass --format csv or --format ndjson.")
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found.")
+
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as lines:
+            report = import_tasks(
+                import_format,
+                lines,
+                user,
+                notify=not options["no_notify"],
+                chunk_size=options["chunk_size"],
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {error['message']}")
+        summary = report.as_dict()
+        self.stdout.write(
+            f"Imported {report.imported} of {report.rows} row(s), "
+            f"{report.failed} failed, in {summary['seconds']}s "
+            f"({summary['rowsPerSecond']} rows/s)."
+        )
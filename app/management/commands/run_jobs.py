@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from app.jobs import run_job, stale_before
+from app.models import Job
+
+
+class Command(BaseCommand):
+    help = "Run pending background jobs, e.g. ones left behind by a worker restart."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retry-running",
+            action="store_true",
+            help="Requeue running jobs whose worker has died before running.",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_running"]:
+            Job.objects.filter(status="running", updated_at__lt=stale_before()).update(
+                status="pending"
+            )
+
+        job_ids = Job.objects.filter(status="pending").order_by("created_at")
+        for job_id in job_ids.values_list("id", flat=True):
+            run_job(job_id)
+            job = Job.objects.get(id=job_id)
+            self.stdout.write(f"{job.id} {job.kind}: {job.status} ({job.processed})")
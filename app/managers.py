@@ -1,4 +1,5 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import models
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -13,4 +14,20 @@ class UserManager(BaseUserManager):
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', True)
         extra_fields.setdefault('is_superuser', True)
-        return self.create_user(email, password, **extra_fields)
\ No newline at end of file
+        return self.create_user(email, password, **extra_fields)
+
+
+class LiveTaskManager(models.Manager):
+    """
+    Tasks that are not in the trash, as ``Task.objects``. Not the default
+    manager: Task's default is the unfiltered ``all_objects``, so related
+    managers and lookups by id still see trashed tasks.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_trashed=False)
+
+
+class TrashedTaskManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_trashed=True)
@@ -0,0 +1,458 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from .query_budget import call_site
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+# With METRICS_DIR set, each process writes its series to <pid>.json there
+# every FLUSH_SECONDS, and the histograms of exited workers are folded into
+# DEAD_FILE so the service's counts never go backwards.
+FLUSH_SECONDS = 5.0
+DEAD_FILE = "dead.json"
+
+
+class Histogram:
+    """
+    Minimal thread-safe, labelled histogram in the Prometheus data model.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            bucket_counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+        start_flushing()
+
+    def snapshot(self):
+        """
+        ``(label values, bucket counts, sum, count)`` per series.
+        """
+        with self._lock:
+            return [
+                (key, list(series[0]), series[1], series[2])
+                for key, series in self._series.items()
+            ]
+
+    def collect(self):
+        """
+        ``(labels, cumulative bucket counts, sum, count)`` per series.
+        """
+        for key, bucket_counts, total, count in self.snapshot():
+            labels = dict(zip(self.labelnames, key))
+            yield labels, cumulative(bucket_counts), total, count
+
+    def reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+
+class Gauge:
+    """
+    Minimal thread-safe, labelled gauge in the Prometheus data model.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+        start_flushing()
+
+    def snapshot(self):
+        """
+        ``(label values, value)`` per series.
+        """
+        with self._lock:
+            return list(self._values.items())
+
+    def collect(self):
+        """
+        ``(labels, value)`` per series.
+        """
+        for key, value in self.snapshot():
+            yield dict(zip(self.labelnames, key)), value
+
+    def reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+
+def cumulative(bucket_counts):
+    result, running = [], 0
+    for bucket_count in bucket_counts:
+        running += bucket_count
+        result.append(running)
+    return result
+
+
+DB_CONNECTION_ACQUIRE_SECONDS = Histogram(
+    "db_connection_acquire_seconds",
+    "Time spent opening or checking out a database connection.",
+    ["alias", "pooled"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+APP_IMPORT_SECONDS = Gauge(
+    "app_import_seconds",
+    "Time spent importing and preloading the application, before forking.",
+)
+
+WORKER_WARMUP_SECONDS = Gauge(
+    "worker_warmup_seconds",
+    "Time a worker spent warming up its database connections after forking.",
+)
+
+WORKER_FIRST_REQUEST_SECONDS = Gauge(
+    "worker_first_request_seconds",
+    "Time the first request handled by this worker took.",
+)
+
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, by route.",
+    ["method", "route", "status"],
+)
+
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries while handling a request, by route.",
+    ["method", "route"],
+)
+
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Number of database queries run while handling a request, by route.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+
+# Holds the RequestTiming of the current request. Like the routing state in
+# app.routers, it is shared by reference so queries run through sync_to_async
+# are counted too.
+_request_timing = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    __slots__ = (
+        "db_queries",
+        "db_time",
+        "view_start",
+        "view_end",
+        "render_end",
+        "n_plus_one_threshold",
+        "query_counts",
+        "repeated_queries",
+    )
+
+    def __init__(self, n_plus_one_threshold=None):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.view_end = None
+        self.render_end = None
+        # Statements are only counted for N+1 detection when a threshold is set.
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.query_counts = {}
+        self.repeated_queries = {}
+
+
+def start_timing(n_plus_one_threshold=None):
+    timing = RequestTiming(n_plus_one_threshold)
+    return timing, _request_timing.set(timing)
+
+
+def end_timing(token):
+    _request_timing.reset(token)
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds each query to the current request's
+    timing. Outside a request, e.g. in background jobs, it only calls through.
+
+    The same SQL run again with different parameters is the N+1 signature, so
+    when a statement reaches the timing's threshold the call site is recorded.
+    """
+    timing = _request_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db_time += time.perf_counter() - start
+        timing.db_queries += 1
+        if timing.n_plus_one_threshold is not None:
+            count = timing.query_counts[sql] = timing.query_counts.get(sql, 0) + 1
+            if count == timing.n_plus_one_threshold:
+                timing.repeated_queries[sql] = call_site()
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver that adds ``time_query`` to the
+    connection's execute wrappers.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def format_labels(labels):
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in labels.items()
+    )
+
+
+def write_json(path, data):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def process_snapshot():
+    return {
+        "histograms": {
+            metric.name: metric.snapshot()
+            for metric in REGISTRY
+            if isinstance(metric, Histogram)
+        },
+        "gauges": {
+            metric.name: metric.snapshot()
+            for metric in REGISTRY
+            if isinstance(metric, Gauge)
+        },
+    }
+
+
+def flush(directory):
+    """
+    Write this process's series to ``<pid>.json`` in ``directory``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    write_json(os.path.join(directory, f"{os.getpid()}.json"), process_snapshot())
+
+
+def flush_forever(directory):
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush(directory)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", directory, e)
+
+
+_flushing_pid = None
+_flushing_lock = threading.Lock()
+
+
+def start_flushing():
+    """
+    Start this process's flush thread on its first observation, when
+    ``METRICS_DIR`` is set.
+    """
+    global _flushing_pid
+    pid = os.getpid()
+    if _flushing_pid == pid or not settings.METRICS_DIR:
+        return
+    with _flushing_lock:
+        if _flushing_pid == pid:
+            return
+        _flushing_pid = pid
+        threading.Thread(
+            target=flush_forever,
+            args=(settings.METRICS_DIR,),
+            name="metrics-flush",
+            daemon=True,
+        ).start()
+
+
+def forget_parent_series():
+    """
+    Runs in the child after a fork. The series copied from the parent are
+    still reported in the parent's file, so the child starts from zero.
+    """
+    global _flushing_lock
+    _flushing_lock = threading.Lock()
+    if settings.configured and settings.METRICS_DIR:
+        for metric in REGISTRY:
+            metric.reset()
+
+
+os.register_at_fork(after_in_child=forget_parent_series)
+
+
+def merge_histograms(merged, histograms):
+    for name, series in histograms.items():
+        merged_series = merged.setdefault(name, {})
+        for key, bucket_counts, total, count in series:
+            key = tuple(key)
+            current = merged_series.get(key)
+            if current is None:
+                merged_series[key] = [list(bucket_counts), total, count]
+                continue
+            current[0] = [a + b for a, b in zip(current[0], bucket_counts)]
+            current[1] += total
+            current[2] += count
+
+
+def clear_directory(directory):
+    """
+    Remove the files of a previous run. Called by gunicorn's ``on_starting``
+    hook, before any worker exists.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for filename in os.listdir(directory):
+        if filename.endswith((".json", ".tmp")):
+            os.remove(os.path.join(directory, filename))
+
+
+def mark_process_dead(directory, pid):
+    """
+    Fold an exited worker's histograms into ``DEAD_FILE`` and drop its gauges.
+    Called by gunicorn's ``child_exit`` hook in the master, which is the only
+    writer of ``DEAD_FILE``.
+    """
+    path = os.path.join(directory, f"{pid}.json")
+    data = read_json(path)
+    if data is None:
+        return
+    dead_path = os.path.join(directory, DEAD_FILE)
+    merged = {}
+    merge_histograms(merged, (read_json(dead_path) or {}).get("histograms", {}))
+    merge_histograms(merged, data["histograms"])
+    write_json(
+        dead_path,
+        {
+            "histograms": {
+                name: [[list(key), *values] for key, values in series.items()]
+                for name, series in merged.items()
+            }
+        },
+    )
+    os.remove(path)
+
+
+def collect_directory(directory):
+    """
+    Series of every process in ``directory``, this one's flushed first:
+    histograms summed across processes, gauges kept per process with a
+    ``pid`` label.
+    """
+    flush(directory)
+    histograms, gauges = {}, {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            data = read_json(os.path.join(directory, filename))
+        except ValueError:
+            continue
+        if data is None:
+            continue
+        merge_histograms(histograms, data["histograms"])
+        if filename == DEAD_FILE:
+            continue
+        pid = filename.removesuffix(".json")
+        for name, series in data["gauges"].items():
+            gauges.setdefault(name, []).extend(
+                (tuple(key), pid, value) for key, value in series
+            )
+
+    collected = {}
+    for metric in REGISTRY:
+        if isinstance(metric, Gauge):
+            collected[metric.name] = [
+                ({**dict(zip(metric.labelnames, key)), "pid": pid}, value)
+                for key, pid, value in gauges.get(metric.name, [])
+            ]
+        else:
+            collected[metric.name] = [
+                (dict(zip(metric.labelnames, key)), cumulative(values[0]), *values[1:])
+                for key, values in histograms.get(metric.name, {}).items()
+            ]
+    return collected
+
+
+def render_metrics():
+    """
+    Every registered metric in the Prometheus text exposition format: of the
+    whole service with ``METRICS_DIR`` set, otherwise of this process.
+    """
+    if settings.METRICS_DIR:
+        collected = collect_directory(settings.METRICS_DIR)
+    else:
+        collected = {metric.name: list(metric.collect()) for metric in REGISTRY}
+    lines = []
+    for metric in REGISTRY:
+        if isinstance(metric, Gauge):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} gauge")
+            for labels, value in collected[metric.name]:
+                series_labels = format_labels(labels)
+                series_labels = f"{{{series_labels}}}" if series_labels else ""
+                lines.append(f"{metric.name}{series_labels} {value!r}")
+            continue
+
+        histogram = metric
+        lines.append(f"# HELP {histogram.name} {histogram.documentation}")
+        lines.append(f"# TYPE {histogram.name} histogram")
+        for labels, cumulative_counts, total, count in collected[histogram.name]:
+            for bound, bucket_count in zip(histogram.buckets, cumulative_counts):
+                bucket_labels = format_labels({**labels, "le": repr(bound)})
+                lines.append(
+                    f"{histogram.name}_bucket{{{bucket_labels}}} {bucket_count}"
+                )
+            bucket_labels = format_labels({**labels, "le": "+Inf"})
+            lines.append(f"{histogram.name}_bucket{{{bucket_labels}}} {count}")
+            series_labels = format_labels(labels)
+            series_labels = f"{{{series_labels}}}" if series_labels else ""
+            lines.append(f"{histogram.name}_sum{series_labels} {total!r}")
+            lines.append(f"{histogram.name}_count{series_labels} {count}")
+    return "\n".join(lines) + "\n"
@@ -1,7 +1,45 @@
-from rest_framework.response import Response
+import gzip
+import logging
+import time
+import zlib
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import (
+    BadRequest,
+    ImproperlyConfigured,
+    PermissionDenied,
+    SuspiciousOperation,
+)
+from django.core.handlers.exception import convert_exception_to_response
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
 from rest_framework import status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.exceptions import APIException
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+from .metrics import (
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DB_SECONDS,
+    HTTP_REQUEST_DURATION_SECONDS,
+    end_timing,
+    start_timing,
+)
+from .query_budget import enforce_query_budget
+from .renderers import render_response
+from .routers import (
+    aroute_reads_for,
+    end_routing,
+    pin_user,
+    replica_configured,
+    route_reads_for,
+    start_routing,
+)
+from .warmup import record_first_request
+
+logger = logging.getLogger(__name__)
 
 
 class TokenAuthSupportCookie(TokenAuthentication):
@@ -16,17 +54,537 @@ class TokenAuthSupportCookie(TokenAuthentication):
             return self.authenticate_credentials(request.COOKIES.get("token"))
         return super().authenticate(request)
 
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        route_reads_for(user)
+        return user, token
+
+    async def aauthenticate(self, request):
+        """
+        Async counterpart of ``authenticate`` for native async views, which
+        receive a plain Django request.
+        """
+        if "token" in request.COOKIES and "HTTP_AUTHORIZATION" not in request.META:
+            return await self.aauthenticate_credentials(request.COOKIES.get("token"))
+
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed(_("Invalid token header."))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed(
+                _(
+                    "Invalid token header. Token string should not contain invalid characters."
+                )
+            )
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related("user").aget(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+
+        await aroute_reads_for(token.user)
+        return (token.user, token)
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise is sync-only, which would push every request through a thread
+    hop under ASGI. Serve static files on a thread, but pass everything else
+    straight through to the async handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class PerformanceMiddleware:
+    """
+    Record each request's database query count, database time, view time and
+    render time. They are sent back in a Server-Timing header and added to the
+    per-route histograms served on /metrics.
+
+    Unless ``QUERY_BUDGET_MODE`` is "off", requests are also checked against
+    ``QUERY_BUDGETS``, and reads for N+1 query patterns; writes such as the
+    chunked import repeat their statements by design. Violations are logged.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = settings.SERVER_TIMING
+        self.query_budget_enabled = settings.QUERY_BUDGET_MODE != "off"
+        self.n_plus_one_threshold = (
+            settings.N_PLUS_ONE_THRESHOLD if self.query_budget_enabled else None
+        )
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.timing, token = start_timing(self.n_plus_one_check(request))
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_timing(token)
+        return self.record(request, response, start)
+
+    async def __acall__(self, request):
+        request.timing, token = start_timing(self.n_plus_one_check(request))
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_timing(token)
+        return self.record(request, response, start)
+
+    def n_plus_one_check(self, request):
+        if request.method in ("GET", "HEAD"):
+            return self.n_plus_one_threshold
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = request.timing
+        timing.view_end = time.perf_counter()
+
+        def render_finished(response):
+            timing.render_end = time.perf_counter()
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+    def record(self, request, response, start):
+        end = time.perf_counter()
+        timing = request.timing
+        total = end - start
+        view = render = 0.0
+        if timing.view_start is not None:
+            # Responses that aren't rendered lazily are rendered by the view.
+            view_end = timing.view_end or end
+            view = view_end - timing.view_start
+            if timing.render_end is not None:
+                render = timing.render_end - view_end
+
+        if request.resolver_match is not None:
+            route = request.resolver_match.route
+        else:
+            route = "<unmatched>"
+        HTTP_REQUEST_DURATION_SECONDS.observe(
+            total, method=request.method, route=route, status=response.status_code
+        )
+        HTTP_REQUEST_DB_SECONDS.observe(
+            timing.db_time, method=request.method, route=route
+        )
+        HTTP_REQUEST_DB_QUERIES.observe(
+            timing.db_queries, method=request.method, route=route
+        )
+
+        if self.server_timing:
+            response.headers["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={timing.db_time * 1000:.2f};desc="{timing.db_queries} queries"',
+                    f"view;dur={view * 1000:.2f}",
+                    f"render;dur={render * 1000:.2f}",
+                    f"total;dur={total * 1000:.2f}",
+                ]
+            )
+
+        record_first_request(total)
+        if self.query_budget_enabled:
+            enforce_query_budget(request, timing)
+        return response
+
+
+class SiteMiddleware:
+    """
+    Run the browser-facing ``SITE_MIDDLEWARE`` (sessions, CSRF, auth, messages
+    and clickjacking protection) for everything but the API. API requests
+    under ``API_URL_PREFIX`` authenticate with ``TokenAuthSupportCookie`` and
+    skip them; the admin keeps them. Their view, template response and
+    exception hooks are forwarded, since Django only calls the hooks of
+    middleware listed in ``MIDDLEWARE``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.api_prefix = settings.API_URL_PREFIX
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+
+        handler = get_response
+        for middleware_path in reversed(settings.SITE_MIDDLEWARE):
+            middleware = import_string(middleware_path)
+            if not (
+                getattr(middleware, "sync_capable", True)
+                and getattr(middleware, "async_capable", False)
+            ):
+                raise ImproperlyConfigured(
+                    f"{middleware_path} in SITE_MIDDLEWARE must be both sync and "
+                    "async capable."
+                )
+            mw_instance = middleware(handler)
+            if hasattr(mw_instance, "process_view"):
+                self.view_hooks.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, "process_template_response"):
+                self.template_response_hooks.append(
+                    mw_instance.process_template_response
+                )
+            if hasattr(mw_instance, "process_exception"):
+                self.exception_hooks.append(mw_instance.process_exception)
+            handler = convert_exception_to_response(mw_instance)
+        self.site_handler = handler
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def is_api(self, request):
+        return request.path_info.startswith(self.api_prefix)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.is_api(request):
+            return self.get_response(request)
+        return self.site_handler(request)
+
+    async def __acall__(self, request):
+        if self.is_api(request):
+            return await self.get_response(request)
+        return await self.site_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if not self.is_api(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.is_api(request):
+            return None
+        for hook in self.exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
 
 class ExceptionMiddleware:
+    """
+    Answer exceptions raised by API views with the API's JSON error shape
+    instead of Django's HTML error pages. Exceptions outside the API, e.g. in
+    the admin, are left to Django.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # Exceptions Django turns into client errors rather than a 500.
+    client_errors = (
+        (Http404, status.HTTP_404_NOT_FOUND, "Not found."),
+        (PermissionDenied, status.HTTP_403_FORBIDDEN, "Permission denied."),
+        (BadRequest, status.HTTP_400_BAD_REQUEST, "Bad request."),
+        (SuspiciousOperation, status.HTTP_400_BAD_REQUEST, "Bad request."),
+    )
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.api_prefix = settings.API_URL_PREFIX
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not request.path_info.startswith(self.api_prefix):
+            return None
+        for exception_class, status_code, message in self.client_errors:
+            if isinstance(exception, exception_class):
+                return render_response(
+                    {"status": False, "message": message}, status=status_code
+                )
+
+        logger.exception(
+            "Unhandled exception in %s %s",
+            request.method,
+            request.path,
+            extra={"status_code": 500, "request": request},
+        )
+        return render_response(
+            {"status": False, "message": str(exception)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of safe requests to the views in ``REPLICA_READ_VIEWS`` to
+    the read replica. A successful write pins its user to the primary for
+    ``REPLICA_PIN_SECONDS`` in the shared cache, so they read their own writes
+    from any client while the replica catches up; the pin is checked once
+    token authentication knows the user, so the token lookup itself always
+    reads the primary. An anonymous write sets a short-lived cookie instead.
+    """
+
+    sync_capable = True
+    async_capable = True
+    pin_cookie_name = "db_pin"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = replica_configured()
+        self.read_views = set(settings.REPLICA_READ_VIEWS)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        request.routing_state, token = start_routing()
         try:
             response = self.get_response(request)
-        except Exception as e:
-            response = Response(
-                {"status": False, "message": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        finally:
+            end_routing(token)
+        return self.pin_after_write(request, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        request.routing_state, token = start_routing()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_routing(token)
+        return self.pin_after_write(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            self.enabled
+            and request.method in ("GET", "HEAD")
+            and request.resolver_match.url_name in self.read_views
+            and self.pin_cookie_name not in request.COOKIES
+        ):
+            request.routing_state.replica_allowed = True
+
+    def pin_after_write(self, request, response):
+        if (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+        ):
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_user(user.id)
+                return response
+            response.set_cookie(
+                self.pin_cookie_name,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=True,
+                httponly=True,
+                samesite="None",
             )
         return response
+
+
+async def iterate_in_thread(iterator):
+    """
+    Iterate a sync iterator from async code one item at a time, each step
+    run in the request's sync thread like the view that made it, so the
+    queries behind it keep their connection.
+    """
+    done = object()
+    while (chunk := await sync_to_async(next)(iterator, done)) is not done:
+        yield chunk
+
+
+class CompressionMiddleware:
+    """
+    Compress API responses with Brotli or gzip, whichever the client prefers
+    in Accept-Encoding, preferring Brotli on a tie. Only content types in
+    ``COMPRESSION_CONTENT_TYPES`` are compressed, and buffered responses
+    smaller than ``COMPRESSION_MIN_SIZE`` bytes are sent as they are.
+    Streaming responses are compressed chunk by chunk and flushed after each
+    chunk so they keep streaming. Under ASGI, sync streaming responses of
+    any content type are handed on as async iterators that pull one chunk
+    at a time, so they stream instead of being buffered.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL
+        self.content_types = set(settings.COMPRESSION_CONTENT_TYPES)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if response.streaming and not response.is_async:
+            # Served as it is, Django would read the whole iterator into a
+            # list before sending the first byte.
+            response.streaming_content = iterate_in_thread(response.streaming_content)
+        return self.process_response(request, response)
+
+    def negotiate(self, request):
+        accepted = {}
+        for item in request.headers.get("Accept-Encoding", "").split(","):
+            coding, _, params = item.strip().lower().partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    continue
+            accepted[coding.strip()] = quality
+
+        wildcard = accepted.get("*", 0)
+        brotli_quality = accepted.get("br", wildcard)
+        gzip_quality = accepted.get("gzip", wildcard)
+        if brotli_quality > 0 and brotli_quality >= gzip_quality:
+            return "br"
+        if gzip_quality > 0:
+            return "gzip"
+        return None
+
+    def compressor(self, encoding):
+        """
+        Return ``(compress_chunk, finish)`` callables that compress a stream
+        with ``encoding``, flushing after every chunk.
+        """
+        if encoding == "br":
+            compressor = brotli.Compressor(
+                mode=brotli.MODE_TEXT, quality=self.brotli_quality
+            )
+            return (
+                lambda chunk: compressor.process(chunk) + compressor.flush(),
+                compressor.finish,
+            )
+        compressor = zlib.compressobj(
+            self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+        return (
+            lambda chunk: compressor.compress(chunk)
+            + compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush,
+        )
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if content_type not in self.content_types:
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self.negotiate(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compress_chunk, finish = self.compressor(encoding)
+            original_iterator = response.streaming_content
+            if response.is_async:
+
+                async def compressed_content():
+                    async for chunk in original_iterator:
+                        yield compress_chunk(chunk)
+                    yield finish()
+
+            else:
+
+                def compressed_content():
+                    for chunk in original_iterator:
+                        yield compress_chunk(chunk)
+                    yield finish()
+
+            response.streaming_content = compressed_content()
+            del response.headers["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(
+                    response.content,
+                    mode=brotli.MODE_TEXT,
+                    quality=self.brotli_quality,
+                )
+            else:
+                compressed = gzip.compress(
+                    response.content, compresslevel=self.gzip_level, mtime=0
+                )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(response.content))
+
+        # A compressed representation is not byte-for-byte the original.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:38
+
+import app.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_task_managers_and_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='id',
+            field=models.UUIDField(default=app.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='id',
+            field=models.UUIDField(default=app.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='notice',
+            name='id',
+            field=models.UUIDField(default=app.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='id',
+            field=models.UUIDField(default=app.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(default=app.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,60 @@
+import uuid
+
+from django.db import migrations
+
+from app.ids import uuid7
+
+REKEYED_MODELS = ["User", "Task", "Activity", "Notice", "Job"]
+
+
+def referencing_fields(apps, model):
+    """
+    Every concrete foreign key, including auto-created M2M through tables and
+    other apps' models such as auth tokens, that points at ``model``.
+    """
+    for related_model in apps.get_models(include_auto_created=True):
+        for field in related_model._meta.local_fields:
+            if field.is_relation and field.related_model is model:
+                yield related_model, field
+
+
+def rekey_existing_ids(apps, schema_editor):
+    """
+    Replace the random UUID4 primary keys of existing rows with UUID7 values
+    derived from ``created_at``, so id order matches creation order for old
+    and new rows alike. Foreign keys are rewritten in the same transaction;
+    the constraints are deferred until commit.
+    """
+    for model_name in REKEYED_MODELS:
+        model = apps.get_model("app", model_name)
+        references = list(referencing_fields(apps, model))
+        previous_id = 0
+
+        rows = list(
+            model.objects.order_by("created_at", "pk").values_list("pk", "created_at")
+        )
+        for old_id, created_at in rows:
+            new_id = uuid7(int(created_at.timestamp() * 1000))
+            # Rows created in the same millisecond keep their relative order.
+            if new_id.int <= previous_id:
+                new_id = uuid.UUID(int=previous_id + 1)
+            previous_id = new_id.int
+
+            model.objects.filter(pk=old_id).update(id=new_id)
+            for related_model, field in references:
+                related_model.objects.filter(**{field.attname: old_id}).update(
+                    **{field.attname: new_id}
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0005_time_ordered_ids"),
+        ("admin", "0003_logentry_add_action_flag_choices"),
+        ("authtoken", "0004_alter_tokenproxy_options"),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_existing_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+SEARCH_FIELDS = ["name", "title", "role", "email"]
+PREFIX_FIELDS = ["name", "email"]
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Index the expressions Django's lookups compile to on PostgreSQL:
+    trigram indexes for ``icontains`` (``UPPER(col::text) LIKE UPPER(%s)``)
+    and pattern indexes for ``istartswith``. Other databases scan.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS user_{field}_trgm_idx ON app_user "
+            f"USING gin ((UPPER({field}::text)) gin_trgm_ops)"
+        )
+    for field in PREFIX_FIELDS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS user_{field}_prefix_idx ON app_user "
+            f"((UPPER({field}::text)) text_pattern_ops)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS user_{field}_trgm_idx")
+    for field in PREFIX_FIELDS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS user_{field}_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0006_rekey_existing_ids"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["name", "id"], name="user_name_id_idx"),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
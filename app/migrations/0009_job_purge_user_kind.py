@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0008_user_updated_at_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="job",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("purge_trashed_tasks", "Purge Trashed Tasks"),
+                    ("purge_user", "Purge User"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:13
+
+import app.ids
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0009_job_purge_user_kind"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=app.ids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("created", models.PositiveIntegerField(default=0)),
+                ("todo", models.PositiveIntegerField(default=0)),
+                ("in_progress", models.PositiveIntegerField(default=0)),
+                ("completed", models.PositiveIntegerField(default=0)),
+                ("high", models.PositiveIntegerField(default=0)),
+                ("medium", models.PositiveIntegerField(default=0)),
+                ("normal", models.PositiveIntegerField(default=0)),
+                ("low", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("user__isnull", False)),
+                        fields=("user", "day"),
+                        name="rollup_user_day_uniq",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("user__isnull", True)),
+                        fields=("day",),
+                        name="rollup_global_day_uniq",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0011_task_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activity",
+            index=models.Index(
+                fields=["created_at", "id"], name="activity_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:40
+
+import django.db.models.manager
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0014_idempotency_keys"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="task",
+            options={
+                "base_manager_name": "all_objects",
+                "default_manager_name": "all_objects",
+            },
+        ),
+        migrations.AlterModelManagers(
+            name="task",
+            managers=[
+                ("all_objects", django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
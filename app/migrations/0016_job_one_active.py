@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:57
+
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """
+    Keep the oldest of any active jobs with the same kind and params, which
+    the constraint would reject, and mark the rest failed.
+    """
+    Job = apps.get_model("app", "Job")
+    seen = set()
+    duplicate_ids = []
+    active_jobs = Job.objects.filter(status__in=["pending", "running"]).order_by(
+        "created_at"
+    )
+    for job in active_jobs:
+        key = (job.kind, repr(sorted(job.params.items())))
+        if key in seen:
+            duplicate_ids.append(job.id)
+        seen.add(key)
+    Job.objects.filter(id__in=duplicate_ids).update(
+        status="failed", error="Duplicate of an earlier job."
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0015_task_default_manager"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="job",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["pending", "running"])),
+                fields=("kind", "params"),
+                name="job_one_active_per_kind_params",
+            ),
+        ),
+    ]
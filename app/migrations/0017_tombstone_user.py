@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-19 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0016_job_one_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tasktombstone",
+            name="user_id",
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="tasktombstone",
+            index=models.Index(
+                fields=["user_id", "deleted_at"], name="tombstone_user_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-19 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0017_tombstone_user"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="taskdailyrollup",
+            name="rollup_global_day_uniq",
+        ),
+        migrations.AddField(
+            model_name="taskdailyrollup",
+            name="shard",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name="taskdailyrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user__isnull", True)),
+                fields=("day", "shard"),
+                name="rollup_global_day_uniq",
+            ),
+        ),
+    ]
@@ -1,9 +1,9 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from django.utils import timezone
-from .managers import UserManager
+from .managers import UserManager, LiveTaskManager, TrashedTaskManager
+from .ids import uuid7
 from django.conf import settings
-import uuid
 
 
 class TimeStampedModel(models.Model):
@@ -15,7 +15,7 @@ class TimeStampedModel(models.Model):
 
 
 class User(AbstractBaseUser, PermissionsMixin, TimeStampedModel):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     email = models.EmailField(unique=True)
     name = models.CharField(max_length=255)
     title = models.CharField(max_length=255)
@@ -31,12 +31,20 @@ class User(AbstractBaseUser, PermissionsMixin, TimeStampedModel):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["name", "title", "role"]
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the team directory.
+            models.Index(fields=["name", "id"], name="user_name_id_idx"),
+            # Incremental refreshes of the user directory (app/directory.py).
+            models.Index(fields=["updated_at"], name="user_updated_at_idx"),
+        ]
+
     def __str__(self):
         return self.email
 
 
 class Activity(TimeStampedModel):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     type = models.CharField(
         max_length=15,
         choices=[
@@ -55,12 +63,18 @@ class Activity(TimeStampedModel):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="activities"
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the activity feed, newest first.
+            models.Index(fields=["created_at", "id"], name="activity_created_id_idx"),
+        ]
+
     def __str__(self):
         return self.activity
 
 
 class Task(TimeStampedModel):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     title = models.CharField(max_length=255)
     date = models.DateTimeField(default=timezone.now)
     priority = models.CharField(
@@ -90,12 +104,147 @@ class Task(TimeStampedModel):
     )
     is_trashed = models.BooleanField(default=False)
 
+    objects = LiveTaskManager()
+    trashed = TrashedTaskManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        # Reverse managers (user.team_tasks), the admin and anything else that
+        # doesn't name a manager see every task, as before; views pick
+        # objects or trashed explicitly.
+        base_manager_name = "all_objects"
+        default_manager_name = "all_objects"
+        indexes = [
+            # Exports read tasks in this order and resume from a position in it.
+            models.Index(fields=["created_at", "id"], name="task_created_id_idx"),
+            # Delta sync reads the tasks changed since a point in time.
+            models.Index(fields=["updated_at"], name="task_updated_at_idx"),
+            models.Index(
+                fields=["stage", "priority"],
+                name="task_live_stage_idx",
+                condition=models.Q(is_trashed=False),
+            ),
+            models.Index(
+                fields=["-updated_at"],
+                name="task_trashed_updated_idx",
+                condition=models.Q(is_trashed=True),
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
 
+class TaskTombstone(models.Model):
+    """
+    A task gone from a user's view, so delta sync clients learn to drop it:
+    deleted while they were on its team, or they were removed from the team.
+    Tombstones without a user are for admins, who see every task and are
+    only told about deletions. Pruned by the ``prune_tombstones`` command
+    after ``TOMBSTONE_RETENTION_DAYS``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    task_id = models.UUIDField()
+    # Not a foreign key: a purged user's tombstones are pruned with the rest.
+    user_id = models.UUIDField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Delta sync reads one user's tombstones since a point in time.
+            models.Index(fields=["user_id", "deleted_at"], name="tombstone_user_idx"),
+        ]
+
+    def __str__(self):
+        return str(self.task_id)
+
+
+class TaskDailyRollup(models.Model):
+    """
+    Task counters for one day, for one user's tasks or, with no user, for
+    all tasks. Stage counters count the tasks that entered the stage that
+    day, including the stage a task was created in; priority counters count
+    the tasks created that day.
+
+    Every task write adds to the global counters, so they are spread over
+    ``app.rollups.GLOBAL_SHARDS`` rows per day, picked at random, instead of
+    making all writers queue on one row. A user's row is always shard 0.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    day = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="task_rollups",
+    )
+    shard = models.PositiveSmallIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    todo = models.PositiveIntegerField(default=0)
+    in_progress = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    high = models.PositiveIntegerField(default=0)
+    medium = models.PositiveIntegerField(default=0)
+    normal = models.PositiveIntegerField(default=0)
+    low = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the indexes the analytics range queries use.
+            models.UniqueConstraint(
+                fields=["user", "day"],
+                name="rollup_user_day_uniq",
+                condition=models.Q(user__isnull=False),
+            ),
+            models.UniqueConstraint(
+                fields=["day", "shard"],
+                name="rollup_global_day_uniq",
+                condition=models.Q(user__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.user_id or 'all'}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client's ``Idempotency-Key`` and the response its first request got,
+    replayed to retries until ``expires_at``. Pruned by the
+    ``prune_idempotency_keys`` command.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+    )
+    key = models.CharField(max_length=255)
+    # Hash of the method, path and body the key was first used with.
+    fingerprint = models.CharField(max_length=64)
+    # Both empty while the first request is in flight.
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="idempotency_user_key_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
 class Notice(TimeStampedModel):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     team = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="notices")
     text = models.TextField()
     task = models.ForeignKey("Task", on_delete=models.CASCADE, related_name="notices")
@@ -113,3 +262,50 @@ class Notice(TimeStampedModel):
 
     def __str__(self):
         return self.text[:50]
+
+
+class Job(TimeStampedModel):
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    kind = models.CharField(
+        max_length=50,
+        choices=[
+            ("purge_trashed_tasks", "Purge Trashed Tasks"),
+            ("purge_user", "Purge User"),
+        ],
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("completed", "Completed"),
+            ("failed", "Failed"),
+        ],
+        default="pending",
+    )
+    params = models.JSONField(default=dict, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="jobs",
+    )
+
+    class Meta:
+        constraints = [
+            # enqueue_job hands back the active job instead of a duplicate.
+            models.UniqueConstraint(
+                fields=["kind", "params"],
+                name="job_one_active_per_kind_params",
+                condition=models.Q(status__in=["pending", "running"]),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
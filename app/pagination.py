@@ -0,0 +1,39 @@
+import base64
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """
+    Opaque cursor for keyset pagination, holding the sort key of the last row
+    on the page.
+    """
+    data = json.dumps(values, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+def page_size(value, default, maximum):
+    """
+    Parse a ``limit`` query parameter, clamped to ``1..maximum``.
+    """
+    if value is None:
+        return default
+    try:
+        return max(1, min(int(value), maximum))
+    except ValueError:
+        return default
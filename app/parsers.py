@@ -0,0 +1,25 @@
+import codecs
+import io
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+
+class ORJSONParser(JSONParser):
+    """
+    Parse JSON request bodies with orjson. Bodies it rejects are parsed again
+    by ``JSONParser``, so invalid JSON fails with the same error messages.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        body = stream.read()
+
+        try:
+            # orjson reads UTF-8 bytes directly.
+            if codecs.lookup(encoding).name == "utf-8":
+                return orjson.loads(body)
+            return orjson.loads(body.decode(encoding))
+        except (orjson.JSONDecodeError, UnicodeDecodeError):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
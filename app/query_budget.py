@@ -0,0 +1,55 @@
+import logging
+import os
+import traceback
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+IGNORED_FILES = {
+    os.path.join(APP_DIR, "metrics.py"),
+    os.path.join(APP_DIR, "query_budget.py"),
+}
+
+
+def call_site():
+    """
+    The innermost frame of this app's code in the current stack, e.g.
+    ``app/serializers.py:53 in task_data``.
+    """
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(APP_DIR) and frame.filename not in IGNORED_FILES:
+            filename = os.path.relpath(frame.filename, os.path.dirname(APP_DIR))
+            return f"{filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+def query_budget_violations(request, timing):
+    """
+    Describe how the request broke its entry in ``QUERY_BUDGETS`` and every
+    statement it repeated ``N_PLUS_ONE_THRESHOLD`` or more times.
+    """
+    violations = []
+    if request.resolver_match is not None:
+        budget = settings.QUERY_BUDGETS.get(request.resolver_match.url_name)
+        if budget is not None and timing.db_queries > budget:
+            violations.append(
+                f"{timing.db_queries} queries, budget is {budget} "
+                f"({request.resolver_match.url_name})"
+            )
+    for sql, site in timing.repeated_queries.items():
+        violations.append(
+            f"Possible N+1: {timing.query_counts[sql]} queries from {site}: {sql}"
+        )
+    return violations
+
+
+def enforce_query_budget(request, timing):
+    """
+    Log a warning if the request went over its query budget or ran an N+1
+    pattern. The response is built by then, and for writes committed, so
+    this only reports; app/tests.py fails on these warnings.
+    """
+    violations = query_budget_violations(request, timing)
+    if violations:
+        logger.warning(f"{request.method} {request.path}: " + "; ".join(violations))
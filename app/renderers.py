@@ -0,0 +1,58 @@
+import orjson
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Render JSON with orjson, which encodes UUIDs and datetimes natively
+    instead of calling back into Python for every value. The output matches
+    DRF's ``JSONRenderer``; indented responses, such as the browsable API's,
+    and values orjson can't encode are rendered by ``JSONRenderer`` itself.
+    """
+
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def default(self, obj):
+        # Decimals, lazy translations, querysets and the other types DRF's
+        # encoder knows about.
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape the line and paragraph separators like JSONRenderer does, as
+        # they are invalid in JavaScript string literals.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+def render_response(data, status=status.HTTP_200_OK, headers=None):
+    """
+    Render ``data`` with the first configured DRF renderer, so the output is
+    byte-for-byte what the DRF views return.
+    """
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+    return HttpResponse(
+        renderer.render(data),
+        status=status,
+        content_type=content_type,
+        headers=headers,
+    )
@@ -0,0 +1,132 @@
+"""
+Daily task counters for the analytics endpoint.
+
+Every task write that creates a task or moves it to another stage adds to the
+day's ``TaskDailyRollup`` rows, in the same transaction: one of the global
+rows and one row per team member. Range queries then read a handful of rows
+per day instead of scanning tasks. The ``backfill_task_rollups`` command rebuilds the
+rows from the task table.
+"""
+
+import random
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from .models import Task, TaskDailyRollup
+
+STAGE_FIELDS = {
+    "todo": "todo",
+    "in progress": "in_progress",
+    "completed": "completed",
+}
+
+PRIORITY_FIELDS = {
+    "high": "high",
+    "medium": "medium",
+    "normal": "normal",
+    "low": "low",
+}
+
+COUNTER_FIELDS = ("created", *STAGE_FIELDS.values(), *PRIORITY_FIELDS.values())
+
+# Number of global rows per day that writes are spread over.
+GLOBAL_SHARDS = 8
+
+
+def created_counts(stage, priority):
+    return {"created": 1, STAGE_FIELDS[stage]: 1, PRIORITY_FIELDS[priority]: 1}
+
+
+def stage_counts(stage):
+    return {STAGE_FIELDS[stage]: 1}
+
+
+def record_task_events(task_ids, counts):
+    """
+    Add ``counts`` once per task to one of today's global rollups and once
+    per task to the rollup of each member of its team. Call it after the
+    task's team is saved, in the transaction that wrote the tasks.
+    """
+    if not task_ids:
+        return
+    per_user = defaultdict(Counter)
+    per_user[None].update({field: n * len(task_ids) for field, n in counts.items()})
+    members = Task.team.through.objects.filter(task_id__in=task_ids).values_list(
+        "user_id", flat=True
+    )
+    for user_id in members:
+        per_user[user_id].update(counts)
+    add_to_rollups(timezone.localdate(), per_user)
+
+
+def add_to_rollups(day, per_user):
+    """
+    Add each user's counts (None for the global row) to their rollup for
+    ``day``, with one UPDATE per distinct set of counts, creating the rows
+    that don't exist yet. The global counts go to a random shard.
+    """
+    shard = random.randrange(GLOBAL_SHARDS)
+    groups = defaultdict(list)
+    for user_id, counts in per_user.items():
+        groups[tuple(sorted(counts.items()))].append(user_id)
+
+    for counts, user_ids in groups.items():
+        counts = dict(counts)
+        increments = {field: F(field) + n for field, n in counts.items()}
+        scope = Q(user_id__in=[user_id for user_id in user_ids if user_id])
+        if None in user_ids:
+            scope |= Q(user__isnull=True, shard=shard)
+        rows = TaskDailyRollup.objects.filter(scope, day=day)
+        if rows.update(**increments) == len(user_ids):
+            continue
+        existing = set(rows.values_list("user_id", flat=True))
+        for user_id in user_ids:
+            if user_id in existing:
+                continue
+            row_shard = shard if user_id is None else 0
+            try:
+                with transaction.atomic():
+                    TaskDailyRollup.objects.create(
+                        day=day, user_id=user_id, shard=row_shard, **counts
+                    )
+            except IntegrityError:
+                # Another write created the day's row first.
+                TaskDailyRollup.objects.filter(
+                    day=day, user_id=user_id, shard=row_shard
+                ).update(**increments)
+
+
+def rollup_series(user_id, start, end):
+    """
+    One entry per day from ``start`` to ``end`` for ``user_id``, or for all
+    tasks when it is None, with zeros for days without a rollup row.
+    """
+    rows = (
+        TaskDailyRollup.objects.filter(user_id=user_id, day__range=(start, end))
+        .values("day")
+        .annotate(**{field: Sum(field) for field in COUNTER_FIELDS})
+        .order_by()
+    )
+    by_day = {row["day"]: row for row in rows}
+
+    series = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day, {})
+        series.append(
+            {
+                "date": day.isoformat(),
+                "created": row.get("created", 0),
+                "completed": row.get("completed", 0),
+                "stages": {
+                    stage: row.get(field, 0) for stage, field in STAGE_FIELDS.items()
+                },
+                "priorities": {
+                    priority: row.get(field, 0)
+                    for priority, field in PRIORITY_FIELDS.items()
+                },
+            }
+        )
+    return series
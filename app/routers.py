@@ -0,0 +1,96 @@
+import contextvars
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA_ALIAS = "replica"
+
+PIN_KEY_PREFIX = "db-pin:"
+
+# Holds the RoutingState of the current request. The state object is shared
+# by reference, so thread hops made by sync_to_async (which copy the context)
+# still see changes made in process_view.
+_routing_state = contextvars.ContextVar("replica_routing_state", default=None)
+
+
+class RoutingState:
+    __slots__ = ("replica_allowed", "use_replica")
+
+    def __init__(self):
+        # Set for replica-safe requests; reads only move to the replica once
+        # route_reads_for() has checked the authenticated user's pin.
+        self.replica_allowed = False
+        self.use_replica = False
+
+
+def start_routing():
+    state = RoutingState()
+    return state, _routing_state.set(state)
+
+
+def end_routing(token):
+    _routing_state.reset(token)
+
+
+def use_primary():
+    """
+    Send the rest of the current request's reads to the primary.
+    """
+    state = _routing_state.get()
+    if state is not None:
+        state.replica_allowed = state.use_replica = False
+
+
+def pin_key(user_id):
+    return f"{PIN_KEY_PREFIX}{user_id}"
+
+
+def pin_user(user_id):
+    """
+    Send ``user_id``'s reads to the primary for ``REPLICA_PIN_SECONDS``, so
+    they see their own write on every device while the replica catches up.
+    """
+    cache.set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def route_reads_for(user):
+    """
+    Let a replica-safe request read from the replica, now that its user is
+    known, unless the user is pinned to the primary.
+    """
+    state = _routing_state.get()
+    if state is not None and state.replica_allowed:
+        state.use_replica = cache.get(pin_key(user.id)) is None
+
+
+async def aroute_reads_for(user):
+    state = _routing_state.get()
+    if state is not None and state.replica_allowed:
+        state.use_replica = await cache.aget(pin_key(user.id)) is None
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the replica only while a request marked replica-safe by
+    ReplicaRoutingMiddleware is running. Everything else, including all writes,
+    goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None and state.use_replica:
+            return REPLICA_ALIAS
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
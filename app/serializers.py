@@ -1,8 +1,12 @@
 from rest_framework import serializers
-from .models import User, Notice, Task, Activity
+from .models import User, Notice, Task, Activity, Job
+from .jobs import job_metrics
 from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework.exceptions import AuthenticationFailed
 from datetime import datetime
+from .directory import user_directory
+from .rollups import created_counts, record_task_events
 
 
 def snake_to_camel(snake_str):
@@ -10,6 +14,56 @@ def snake_to_camel(snake_str):
     return components[0] + "".join(x.title() for x in components[1:])
 
 
+def team_member_data(member):
+    return {
+        "id": member.id,
+        "_id": member.id,
+        "name": member.name,
+        "title": member.title,
+        "role": member.role,
+        "email": member.email,
+    }
+
+
+def task_activity_data(activity, include_date=True):
+    data = {
+        "id": activity.id,
+        "_id": activity.id,
+        "type": activity.type,
+        "activity": activity.activity,
+        "by": user_directory.name(activity.by_id),
+    }
+    if include_date:
+        data["date"] = activity.created_at.strftime("%Y-%m-%d %H:%M:%S")
+    return data
+
+
+def task_data(task, include_activity_dates=True):
+    """
+    Task payload shared by the task list, detail and dashboard endpoints.
+    People are resolved from the user directory; pass tasks fetched with
+    ``prefetch_related("activities")`` through ``load_task_people`` first.
+    """
+    return {
+        "id": task.id,
+        "_id": task.id,
+        "title": task.title,
+        "stage": task.stage,
+        "priority": task.priority,
+        "subTasks": task.sub_tasks,
+        "assets": task.assets,
+        "date": task.date.strftime("%Y-%m-%d"),
+        "team": [
+            team_member_data(member)
+            for member in user_directory.get_many(task.team_ids)
+        ],
+        "activities": [
+            task_activity_data(activity, include_activity_dates)
+            for activity in task.activities.all()
+        ],
+    }
+
+
 class CamelCaseSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         rep = super().to_representation(instance)
@@ -77,7 +131,9 @@ class LoginSerializer(serializers.ModelSerializer):
                 "user account has been deactivated, contact the administrator"
             )
         user.last_login = datetime.now()
-        user.save()
+        # Only last_login, so the signals in app/signals.py don't invalidate
+        # the team caches and user directory on every login.
+        user.save(update_fields=["last_login"])
         return user
 
     def to_representation(self, instance):
@@ -152,6 +208,24 @@ class TeamSerializer(serializers.ModelSerializer):
         }
 
 
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ["id", "kind", "status", "processed", "total", "error"]
+
+    def to_representation(self, instance):
+        return {
+            "id": instance.id,
+            "kind": instance.kind,
+            "status": instance.status,
+            "error": instance.error,
+            "createdAt": instance.created_at,
+            "startedAt": instance.started_at,
+            "finishedAt": instance.finished_at,
+            **job_metrics(instance),
+        }
+
+
 class UserIdField(serializers.RelatedField):
     def to_internal_value(self, data):
         try:
@@ -204,6 +278,7 @@ class CreateTaskSerializer(serializers.ModelSerializer):
                 )
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         team_ids = validated_data.pop("team")
         priority = validated_data["priority"]
@@ -241,4 +316,6 @@ class CreateTaskSerializer(serializers.ModelSerializer):
             task.team.add(*team)
             notice.team.add(*team)
 
+        record_task_events([task.id], created_counts(task.stage, task.priority))
+
         return task
@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump, task_scope
+from .directory import user_directory
+from .models import Activity, Task, User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_team(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached payload includes.
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    bump("team")
+
+
+@receiver(post_save, sender=User)
+def update_user_directory(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    transaction.on_commit(lambda: user_directory.put(instance))
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    # The instance's pk is cleared once the delete finishes.
+    user_id = instance.id
+    transaction.on_commit(lambda: user_directory.forget(user_id))
+
+
+# Not on post_delete: a receiver there would stop the deletion collector from
+# fast-deleting tasks. Whatever deletes tasks bumps their scopes itself.
+@receiver(post_save, sender=Task)
+def invalidate_task(sender, instance, **kwargs):
+    bump("tasks", task_scope(instance.id))
+
+
+@receiver(m2m_changed, sender=Task.team.through)
+@receiver(m2m_changed, sender=Task.activities.through)
+def invalidate_task_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        bump("tasks", task_scope(instance.id))
+    elif pk_set:
+        bump("tasks", *(task_scope(task_id) for task_id in pk_set))
+    else:
+        # A cleared reverse relation doesn't say which tasks it touched, but
+        # every cached task payload also depends on "team".
+        bump("tasks", "team")
+
+
+@receiver(post_save, sender=Activity)
+def invalidate_activity(sender, instance, created, **kwargs):
+    # A new activity isn't attached to a task yet; attaching it is an m2m
+    # change. Activities are deleted along with their user, which bumps "team".
+    if created:
+        return
+    task_ids = Task.all_objects.filter(activities=instance).values_list("id", flat=True)
+    bump("tasks", *(task_scope(task_id) for task_id in task_ids))
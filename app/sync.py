@@ -0,0 +1,116 @@
+"""
+Delta sync for offline-capable clients.
+
+A client keeps the cursor of its last sync and asks for the tasks changed
+since then: tasks whose ``updated_at`` moved (created, edited, trashed or
+restored) and tombstones of the tasks that left the user's view, deleted for
+good or taken off the user by a team change. The cursor is the time
+the sync started, less ``SYNC_CURSOR_OVERLAP``, so a write whose transaction
+commits after a sync reads past it still shows up in the next sync. Changes
+inside the overlap are sent again; clients apply them as upserts.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .directory import load_task_people
+from .models import Task, TaskTombstone
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+from .serializers import task_data
+
+SYNC_CURSOR_OVERLAP = timedelta(seconds=30)
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def record_tombstones(task_ids):
+    """
+    Tombstones for tasks about to be deleted: one for each member of their
+    teams and one for admins. Call it before the delete, while the team rows
+    still exist.
+    """
+    members = Task.team.through.objects.filter(task_id__in=task_ids).values_list(
+        "task_id", "user_id"
+    )
+    TaskTombstone.objects.bulk_create(
+        [TaskTombstone(task_id=task_id) for task_id in task_ids]
+        + [
+            TaskTombstone(task_id=task_id, user_id=user_id)
+            for task_id, user_id in members
+        ]
+    )
+
+
+def record_removals(memberships):
+    """
+    Tombstones for members taken off tasks' teams, from ``(task_id,
+    user_id)`` pairs, so the tasks leave their clients too.
+    """
+    TaskTombstone.objects.bulk_create(
+        [
+            TaskTombstone(task_id=task_id, user_id=user_id)
+            for task_id, user_id in memberships
+        ]
+    )
+
+
+def decode_sync_cursor(cursor):
+    """
+    The time a sync cursor stands for. Raises ``CursorExpired`` once the
+    tombstones it would need may have been pruned.
+    """
+    (value,) = decode_cursor(cursor, 1)
+    try:
+        since = parse_datetime(value)
+    except (TypeError, ValueError):
+        since = None
+    if since is None:
+        raise InvalidCursor("Invalid cursor.")
+    if since < timezone.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS):
+        raise CursorExpired("The cursor has expired; sync from scratch.")
+    return since
+
+
+def task_changes(user, since=None):
+    """
+    The user's tasks (every task for admins) changed since ``since``, the
+    trashed ones only by id, and the ids of the tasks that left the user's
+    view since. Without ``since``, every live task.
+    """
+    started = timezone.now()
+    tasks = Task.all_objects.all()
+    if not user.is_superuser:
+        tasks = tasks.filter(team=user.id)
+    if since:
+        tasks = tasks.filter(updated_at__gte=since)
+    else:
+        tasks = tasks.filter(is_trashed=False)
+    tasks = load_task_people(
+        tasks.prefetch_related("activities").order_by("updated_at", "id")
+    )
+
+    deleted = []
+    if since:
+        tombstones = TaskTombstone.objects.filter(deleted_at__gte=since)
+        if user.is_superuser:
+            tombstones = tombstones.filter(user_id__isnull=True)
+        else:
+            tombstones = tombstones.filter(user_id=user.id)
+        # A member removed from a team and added back is sent the task again.
+        current_ids = {task.id for task in tasks}
+        deleted = [
+            task_id
+            for task_id in dict.fromkeys(tombstones.values_list("task_id", flat=True))
+            if task_id not in current_ids
+        ]
+
+    return {
+        "status": True,
+        "tasks": [task_data(task) for task in tasks if not task.is_trashed],
+        "trashed": [task.id for task in tasks if task.is_trashed],
+        "deleted": deleted,
+        "cursor": encode_cursor([(started - SYNC_CURSOR_OVERLAP).isoformat()]),
+    }
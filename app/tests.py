@@ -1,3 +1,453 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from unittest import mock
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .directory import UserDirectory
+from .jobs import enqueue_job
+from .metrics import mark_process_dead, render_metrics
+from .models import Activity, IdempotencyKey, Job, Task, TaskDailyRollup, User
+from .pagination import encode_cursor
+from .views import workload_data
 
-# Create your tests here.
+
+def create_user(email, name, superuser=False):
+    create = User.objects.create_superuser if superuser else User.objects.create_user
+    return create(email=email, password="password", name=name, title="Dev", role="Dev")
+
+
+def token_client(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+@override_settings(QUERY_BUDGET_MODE="log")
+class QueryBudgetTests(TestCase):
+    """
+    Every view in ``QUERY_BUDGETS`` stays within its budget and runs no N+1
+    pattern, for an admin and for a team member, on a cold cache.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin@example.com", "Admin", superuser=True)
+        cls.members = [
+            create_user(f"member{i}@example.com", f"Member {i}") for i in range(6)
+        ]
+        client = token_client(cls.admin)
+        for i in range(8):
+            team = [str(member.id) for member in cls.members[i % 4 : i % 4 + 3]]
+            response = client.post(
+                "/api/task/create",
+                {
+                    "title": f"Task {i}",
+                    "team": team,
+                    "stage": ["todo", "in progress", "completed"][i % 3],
+                    "priority": ["high", "medium", "normal", "low"][i % 4],
+                    "date": "2024-06-01T00:00:00Z",
+                    "assets": [],
+                },
+                format="json",
+            )
+            assert response.status_code == 200, response.content
+        for task in Task.objects.all()[:3]:
+            for member in cls.members[:3]:
+                token_client(member).post(
+                    f"/api/task/activity/{task.id}",
+                    {"type": "commented", "activity": "Looks good."},
+                    format="json",
+                )
+        cls.task = Task.objects.order_by("created_at").first()
+        Task.objects.filter(id=Task.objects.order_by("-created_at")[0].id).update(
+            is_trashed=True
+        )
+
+    def budgeted_paths(self):
+        return {
+            "get_team_list": "/api/user/get-team",
+            "get_team_directory": "/api/user/directory",
+            "get_team_typeahead": "/api/user/directory/typeahead?q=mem",
+            "get_notifications_list": "/api/user/notifications",
+            "get_tasks": "/api/task",
+            "get_trashed_tasks": "/api/task/trash",
+            "get_or_trash_task": f"/api/task/{self.task.id}",
+            "dashboard_statistics": "/api/task/dashboard",
+            "get_task_analytics": "/api/task/analytics",
+            "get_workload": "/api/task/workload",
+            "get_activity_feed": "/api/task/activity-feed",
+            "get_task_changes": "/api/task/changes",
+        }
+
+    def test_every_budget_is_covered(self):
+        self.assertEqual(set(self.budgeted_paths()), set(settings.QUERY_BUDGETS))
+
+    def assert_within_budgets(self, user):
+        client = token_client(user)
+        for url_name, path in self.budgeted_paths().items():
+            with self.subTest(url_name):
+                cache.clear()
+                with self.assertNoLogs("app.query_budget", "WARNING"):
+                    response = client.get(path)
+                self.assertEqual(response.status_code, 200, response.content)
+
+    def test_admin_within_budgets(self):
+        self.assert_within_budgets(self.admin)
+
+    def test_member_within_budgets(self):
+        self.assert_within_budgets(self.members[1])
+
+    def test_chunked_writes_are_not_n_plus_one(self):
+        lines = "".join(
+            f'{{"title": "Imported {i}", "team": ["member1@example.com"]}}\n'
+            for i in range(12)
+        )
+        upload = SimpleUploadedFile("tasks.ndjson", lines.encode())
+        with self.settings(IMPORT_CHUNK_SIZE=2):
+            with self.assertNoLogs("app.query_budget", "WARNING"):
+                response = token_client(self.admin).post(
+                    "/api/task/import/ndjson?notify=0", {"file": upload}
+                )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["imported"], 12)
+
+
+class ImportTests(TestCase):
+    """Invalid rows are reported and skipped without failing the import."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin@example.com", "Admin", superuser=True)
+
+    def import_file(self, import_format, content):
+        upload = SimpleUploadedFile(f"tasks.{import_format}", content)
+        response = token_client(self.admin).post(
+            f"/api/task/import/{import_format}?notify=0", {"file": upload}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_invalid_ndjson_rows(self):
+        lines = [
+            '{"title": "Bad team", "team": 5}',
+            '{"title": "Bad activities", "activities": {"type": "commented"}}',
+            f'{{"title": "{"x" * 256}"}}',
+            '{"title": "Imported"}',
+        ]
+        report = self.import_file("ndjson", "\n".join(lines).encode())
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual([error["row"] for error in report["errors"]], [1, 2, 3])
+        self.assertEqual(
+            list(Task.objects.values_list("title", flat=True)), ["Imported"]
+        )
+
+    def test_invalid_csv_rows(self):
+        content = (
+            b"title,team\n"
+            b"Not UTF-8 \xff,\n"
+            b'"' + b"x" * 200_000 + b'",\n'
+            b"Imported,\n"
+        )
+        report = self.import_file("csv", content)
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual(
+            [error["message"] for error in report["errors"]],
+            ["Invalid UTF-8.", "Invalid CSV: field larger than field limit (131072)"],
+        )
+
+
+class WorkloadTests(TestCase):
+    """
+    The workload is one GROUP BY over the team through table plus, with a
+    cold user directory, one directory load, however many members and
+    assignments there are.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin@example.com", "Admin", superuser=True)
+        cls.members = [
+            create_user(f"member{i}@example.com", f"Member {i}") for i in range(20)
+        ]
+        stages = ["todo", "in progress", "completed"]
+        tasks = Task.objects.bulk_create(
+            Task(title=f"Task {i}", stage=stages[i % 3], priority="normal")
+            for i in range(60)
+        )
+        Task.team.through.objects.bulk_create(
+            Task.team.through(task=task, user=member)
+            for i, task in enumerate(tasks)
+            for member in cls.members[i % 5 :: 5]
+        )
+
+    def test_queries_on_a_cold_directory(self):
+        with mock.patch("app.views.user_directory", UserDirectory()):
+            with self.assertNumQueries(2):
+                workload = workload_data(self.admin)
+        self.assertEqual(len(workload["members"]), 20)
+        self.assertEqual(sum(member["total"] for member in workload["members"]), 160)
+
+    def test_member_sees_only_their_own(self):
+        workload = workload_data(self.members[0])
+        self.assertEqual(
+            [member["id"] for member in workload["members"]], [self.members[0].id]
+        )
+
+
+class SyncTests(TestCase):
+    """
+    Delta sync tells each user about the tasks that left their view, and
+    nobody else.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin@example.com", "Admin", superuser=True)
+        cls.kept, cls.removed = (
+            create_user(f"member{i}@example.com", f"Member {i}") for i in range(2)
+        )
+
+    def create_task(self, title, members):
+        response = token_client(self.admin).post(
+            "/api/task/create",
+            {
+                "title": title,
+                "team": [str(member.id) for member in members],
+                "stage": "todo",
+                "priority": "normal",
+                "date": "2024-06-01T00:00:00Z",
+                "assets": [],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return Task.objects.get(title=title)
+
+    def deleted_since(self, user, since):
+        response = token_client(user).get("/api/task/changes", {"since": since})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["deleted"]
+
+    def test_tombstones_are_scoped(self):
+        shared = self.create_task("Shared", [self.kept, self.removed])
+        other = self.create_task("Other", [self.kept])
+        since = encode_cursor([timezone.now().isoformat()])
+
+        token_client(self.admin).patch(
+            f"/api/task/update/{shared.id}",
+            {"team": [str(self.kept.id)]},
+            format="json",
+        )
+        token_client(self.admin).delete(
+            f"/api/task/delete-restore/{other.id}?actionType=delete"
+        )
+
+        self.assertEqual(self.deleted_since(self.kept, since), [str(other.id)])
+        self.assertEqual(self.deleted_since(self.removed, since), [str(shared.id)])
+        self.assertEqual(self.deleted_since(self.admin, since), [str(other.id)])
+
+    def test_added_back_is_not_deleted(self):
+        task = self.create_task("Task", [self.removed])
+        since = encode_cursor([timezone.now().isoformat()])
+        for team in ([], [str(self.removed.id)]):
+            token_client(self.admin).patch(
+                f"/api/task/update/{task.id}", {"team": team}, format="json"
+            )
+        self.assertEqual(self.deleted_since(self.removed, since), [])
+
+
+class IdempotencyTests(TestCase):
+    """
+    Successes and 404s are replayed to retries; other outcomes release the
+    key so the retry runs the view again.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin@example.com", "Admin", superuser=True)
+        cls.task = Task.objects.create(title="Task")
+
+    def duplicate(self, task_id):
+        return token_client(self.admin).post(
+            f"/api/task/duplicate/{task_id}", HTTP_IDEMPOTENCY_KEY="retry-me"
+        )
+
+    def test_caught_error_releases_the_key(self):
+        with mock.patch.object(Task, "save", side_effect=Exception("Gone away")):
+            self.assertEqual(self.duplicate(self.task.id).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.duplicate(self.task.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.duplicate(self.task.id).content, response.content)
+        self.assertEqual(Task.objects.filter(title="Duplicate - Task").count(), 1)
+
+    def test_not_found_is_replayed(self):
+        missing_id = "01a1556b-da81-7121-93d1-2e3879f0c9fd"
+        self.assertEqual(self.duplicate(missing_id).status_code, 404)
+        response = self.duplicate(missing_id)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+
+
+class BulkUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = create_user("member@example.com", "Member")
+        cls.outsider = create_user("outsider@example.com", "Outsider")
+        cls.task = Task.objects.create(title="Task")
+        cls.task.team.add(cls.member)
+
+    def change_stage(self, user, ids):
+        return token_client(user).put(
+            "/api/task/bulk/change-stage",
+            {"ids": ids, "stage": "completed"},
+            format="json",
+        )
+
+    def test_ids_must_be_a_list_of_strings(self):
+        for ids in ("abc", [1, 2], None):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.change_stage(self.member, ids).status_code, 400)
+
+    def test_only_team_members_update(self):
+        ids = [str(self.task.id)]
+        response = self.change_stage(self.outsider, ids)
+        self.assertEqual(response.json()["results"], {ids[0]: "forbidden"})
+        response = self.change_stage(self.member, ids)
+        self.assertEqual(response.json()["results"], {ids[0]: "updated"})
+        response = self.change_stage(self.member, ids)
+        self.assertEqual(response.json()["results"], {ids[0]: "unchanged"})
+        self.assertEqual(Task.objects.get().stage, "completed")
+
+
+class StageChangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = create_user("member@example.com", "Member")
+        cls.task = Task.objects.create(title="Task")
+        cls.task.team.add(cls.member)
+
+    def setUp(self):
+        self.client = token_client(self.member)
+
+    def change_stage(self, task_id):
+        return self.client.put(
+            f"/api/task/change-stage/{task_id}", {"stage": "completed"}, format="json"
+        )
+
+    def completed_today(self):
+        days = self.client.get("/api/task/analytics").json()["days"]
+        return days[-1]["completed"]
+
+    def test_only_the_move_is_counted(self):
+        self.assertEqual(self.change_stage(self.task.id).status_code, 200)
+        # Authentication, then the UPDATE that matches nothing and the
+        # existence check, in a savepoint.
+        with self.assertNumQueries(5):
+            self.assertEqual(self.change_stage(self.task.id).status_code, 200)
+        self.assertEqual(self.completed_today(), 1)
+        missing_id = "00000000-0000-0000-0000-000000000000"
+        self.assertEqual(self.change_stage(missing_id).status_code, 404)
+
+    def test_global_counts_are_summed_across_shards(self):
+        for shard, task_id in enumerate(
+            Task.objects.create(title=f"Task {i}").id for i in range(3)
+        ):
+            with mock.patch("app.rollups.random.randrange", return_value=shard):
+                self.change_stage(task_id)
+        self.assertEqual(TaskDailyRollup.objects.filter(user__isnull=True).count(), 3)
+        admin = create_user("admin@example.com", "Admin", superuser=True)
+        days = token_client(admin).get("/api/task/analytics").json()["days"]
+        self.assertEqual(days[-1]["completed"], 3)
+
+
+class ActivityFeedTests(TestCase):
+    def test_feed_skips_trashed_tasks_and_repeats(self):
+        member = create_user("member@example.com", "Member")
+        admin = create_user("admin@example.com", "Admin", superuser=True)
+        live, other, trashed = (
+            Task.objects.create(title=title) for title in ("Live", "Other", "Trashed")
+        )
+        for task in (live, other, trashed):
+            task.team.add(member)
+        shared = Activity.objects.create(activity="Shared", by=member)
+        live.activities.add(shared)
+        other.activities.add(shared)
+        trashed.activities.add(
+            Activity.objects.create(activity="On trashed task", by=member)
+        )
+        Task.objects.filter(id=trashed.id).update(is_trashed=True)
+
+        for user in (member, admin):
+            with self.subTest(user=user.name):
+                feed = token_client(user).get("/api/task/activity-feed").json()
+                self.assertEqual(
+                    [activity["activity"] for activity in feed["activities"]],
+                    ["Shared"],
+                )
+
+
+class JobTests(TestCase):
+    def test_running_job_of_a_dead_worker_is_replaced(self):
+        running = Job.objects.create(kind="purge_trashed_tasks", status="running")
+        self.assertEqual(enqueue_job("purge_trashed_tasks"), running)
+
+        last_seen = timezone.now() - timedelta(
+            seconds=settings.JOB_HEARTBEAT_TIMEOUT + 1
+        )
+        Job.objects.filter(id=running.id).update(updated_at=last_seen)
+        job = enqueue_job("purge_trashed_tasks")
+        self.assertNotEqual(job, running)
+        self.assertEqual(job.status, "pending")
+        running.refresh_from_db()
+        self.assertEqual(running.status, "failed")
+
+
+class MetricsTests(SimpleTestCase):
+    """
+    With ``METRICS_DIR`` set, /metrics reports every worker's series, and an
+    exited worker's counts outlive it.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enterContext(override_settings(METRICS_DIR=self.directory))
+
+    def write_worker(self, pid, queries):
+        with open(os.path.join(self.directory, f"{pid}.json"), "w") as f:
+            json.dump(
+                {
+                    "histograms": {
+                        "http_request_db_queries": [
+                            [["GET", "metrics-test"], [0] * 8 + [1], queries, 1]
+                        ]
+                    },
+                    "gauges": {"worker_warmup_seconds": [[[], 0.5]]},
+                },
+                f,
+            )
+
+    def test_workers_are_summed_and_outlive_exit(self):
+        self.write_worker(1, 100)
+        self.write_worker(2, 150)
+        series = 'http_request_db_queries_sum{method="GET",route="metrics-test"}'
+        output = render_metrics()
+        self.assertIn(f"{series} 250", output)
+        self.assertIn('worker_warmup_seconds{pid="1"} 0.5', output)
+
+        mark_process_dead(self.directory, 1)
+        output = render_metrics()
+        self.assertIn(f"{series} 250", output)
+        self.assertNotIn('worker_warmup_seconds{pid="1"}', output)
+        self.assertIn('worker_warmup_seconds{pid="2"} 0.5', output)
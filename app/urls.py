@@ -1,9 +1,13 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import (
     register_user,
     login_user,
     logout_user,
     get_team_list,
+    get_team_directory,
+    get_team_typeahead,
     get_notifications_list,
     mark_notification_read,
     update_user_profile,
@@ -14,21 +18,45 @@ from .views import (
     duplicate_task,
     post_task_activity,
     dashboard_statistics,
+    get_task_analytics,
+    get_workload,
+    get_activity_feed,
+    get_task_changes,
+    export_tasks,
+    import_tasks,
     get_tasks,
+    get_trashed_tasks,
     get_or_trash_task,
     create_subtask,
     update_task,
     update_task_stage,
     delete_restore_task,
     delete_restore_all_tasks,
+    bulk_update_task_stage,
+    bulk_trash_tasks,
+    bulk_restore_tasks,
+    # Jobs
+    get_job_status,
 )
 
+if settings.ASYNC_READ_VIEWS:
+    # Serve the read-heavy endpoints from native async views.
+    get_team_list = async_views.get_team_list
+    get_team_directory = async_views.get_team_directory
+    get_team_typeahead = async_views.get_team_typeahead
+    get_notifications_list = async_views.get_notifications_list
+    get_tasks = async_views.get_tasks
+    get_or_trash_task = async_views.get_or_trash_task
+    dashboard_statistics = async_views.dashboard_statistics
+
 urlpatterns = [
     # Users
     path("user/register", register_user, name="register_user"),
     path("user/login", login_user, name="login_user"),
     path("user/logout", logout_user, name="logout_user"),
     path("user/get-team", get_team_list, name="get_team_list"),
+    path("user/directory", get_team_directory, name="get_team_directory"),
+    path("user/directory/typeahead", get_team_typeahead, name="get_team_typeahead"),
     path("user/notifications", get_notifications_list, name="get_notifications_list"),
     path("user/read-noti", mark_notification_read, name="mark_notification_read"),
     path("user/profile", update_user_profile, name="update_user_profile"),
@@ -43,7 +71,14 @@ urlpatterns = [
     path("task/duplicate/<uuid:id>", duplicate_task, name="duplicate_task"),
     path("task/activity/<uuid:id>", post_task_activity, name="post_task_activity"),
     path("task/dashboard", dashboard_statistics, name="dashboard_statistics"),
+    path("task/analytics", get_task_analytics, name="get_task_analytics"),
+    path("task/workload", get_workload, name="get_workload"),
+    path("task/activity-feed", get_activity_feed, name="get_activity_feed"),
+    path("task/changes", get_task_changes, name="get_task_changes"),
+    path("task/export/<str:export_format>", export_tasks, name="export_tasks"),
+    path("task/import/<str:import_format>", import_tasks, name="import_tasks"),
     path("task", get_tasks, name="get_tasks"),
+    path("task/trash", get_trashed_tasks, name="get_trashed_tasks"),
     path("task/<uuid:id>", get_or_trash_task, name="get_or_trash_task"),
     path("task/create-subtask/<uuid:id>", create_subtask, name="create_subtask"),
     path("task/update/<uuid:id>", update_task, name="update_task"),
@@ -56,4 +91,13 @@ urlpatterns = [
     path(
         "task/delete-restore", delete_restore_all_tasks, name="delete_restore_all_tasks"
     ),
+    path(
+        "task/bulk/change-stage",
+        bulk_update_task_stage,
+        name="bulk_update_task_stage",
+    ),
+    path("task/bulk/trash", bulk_trash_tasks, name="bulk_trash_tasks"),
+    path("task/bulk/restore", bulk_restore_tasks, name="bulk_restore_tasks"),
+    # Jobs
+    path("job/<uuid:id>", get_job_status, name="get_job_status"),
 ]
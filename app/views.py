@@ -1,12 +1,18 @@
 # views.py
 import os
+import uuid
+from datetime import date, timedelta
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import user_passes_test
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Notice, Task, Activity
+from .models import Notice, Task, Activity, Job
 from .serializers import (
     UserRegisterSerializer,
     LoginSerializer,
@@ -14,15 +20,53 @@ from .serializers import (
     NoticeSerializer,
     CreateTaskSerializer,
     TeamSerializer,
+    JobSerializer,
+    task_data,
+    team_member_data,
 )
+from .cache import bump, cached, task_scope
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, page_size
+from .directory import load_task_people, user_directory
+from .exports import (
+    EXPORT_CONTENT_TYPES,
+    export_chunks,
+    export_queryset,
+    parse_export_datetime,
+)
+from .imports import IMPORT_FORMATS, import_tasks as import_task_records
+from .rollups import (
+    created_counts,
+    record_task_events,
+    rollup_series,
+    stage_counts,
+)
+from .sync import (
+    CursorExpired,
+    decode_sync_cursor,
+    record_removals,
+    record_tombstones,
+    task_changes,
+)
+from .jobs import enqueue_job
+from .idempotency import idempotent
+from .metrics import render_metrics
 from .utils import create_jwt_token
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Q, Count, Exists, OuterRef
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import APIException
 
 User = get_user_model()
 
+TEAM_DIRECTORY_PAGE_SIZE = 50
+TEAM_DIRECTORY_MAX_PAGE_SIZE = 200
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 20
+ACTIVITY_FEED_PAGE_SIZE = 50
+ACTIVITY_FEED_MAX_PAGE_SIZE = 200
+
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
@@ -85,34 +129,144 @@ def logout_user(request):
     return response
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_team_list(request):
-    search = request.query_params.get("search", None)
-    query = {}
+def team_list_queryset(search=None):
+    query = Q()
     if search:
-        query = {
-            "name__icontains": search,
-            "title__icontains": search,
-            "role__icontains": search,
-            "email__icontains": search,
-        }
-    users = User.objects.filter(**query)
-    serializer = TeamSerializer(users, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+        # Served by the trigram indexes of migration 0007 on PostgreSQL.
+        query = (
+            Q(name__icontains=search)
+            | Q(title__icontains=search)
+            | Q(role__icontains=search)
+            | Q(email__icontains=search)
+        )
+    return User.objects.filter(query)
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_notifications_list(request):
-    user = request.user
-    notices = (
+def team_directory_queryset(params):
+    """
+    One page of the team directory, ordered by name, plus the page size.
+    One extra row is fetched to tell whether there is a next page.
+    """
+    limit = page_size(
+        params.get("limit"), TEAM_DIRECTORY_PAGE_SIZE, TEAM_DIRECTORY_MAX_PAGE_SIZE
+    )
+    users = team_list_queryset(params.get("search")).order_by("name", "id")
+
+    cursor = params.get("cursor")
+    if cursor:
+        name, user_id = decode_cursor(cursor, 2)
+        if not isinstance(name, str) or not isinstance(user_id, str):
+            raise InvalidCursor("Invalid cursor.")
+        try:
+            user_id = uuid.UUID(user_id)
+        except ValueError:
+            raise InvalidCursor("Invalid cursor.")
+        users = users.filter(Q(name__gt=name) | Q(name=name, id__gt=user_id))
+    return users[: limit + 1], limit
+
+
+def team_directory_data(users, limit):
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor([users[-1].name, users[-1].id])
+    return {
+        "status": True,
+        "users": TeamSerializer(users, many=True).data,
+        "nextCursor": next_cursor,
+    }
+
+
+def team_typeahead_params(params):
+    prefix = params.get("q", "").strip().lower()
+    limit = page_size(params.get("limit"), TYPEAHEAD_LIMIT, TYPEAHEAD_MAX_LIMIT)
+    return prefix, limit
+
+
+def team_typeahead_queryset(prefix, limit):
+    """
+    Top active matches for a name or email prefix, for assigning tasks.
+    Served by the prefix indexes of migration 0007 on PostgreSQL.
+    """
+    return (
+        User.objects.filter(
+            Q(name__istartswith=prefix) | Q(email__istartswith=prefix),
+            is_active=True,
+        )
+        .order_by("name", "id")
+        .values("id", "name")[:limit]
+    )
+
+
+def team_typeahead_data(users):
+    return {
+        "status": True,
+        "users": [
+            {"id": user["id"], "_id": user["id"], "name": user["name"]}
+            for user in users
+        ],
+    }
+
+
+def notifications_queryset(user):
+    return (
         # Notice.objects.filter(team=user, is_read__nin=[user.id])
         Notice.objects.filter(team=user)
         .exclude(is_read__in=[user.id])
         .select_related("task")
+        .prefetch_related("team", "is_read")
         .order_by("-id")
     )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_team_list(request):
+    search = request.query_params.get("search", None)
+    team_data = cached(
+        "team_list",
+        [search],
+        ["team"],
+        lambda: TeamSerializer(team_list_queryset(search), many=True).data,
+    )
+    return Response(team_data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_team_directory(request):
+    try:
+        users, limit = team_directory_queryset(request.query_params)
+    except InvalidCursor as e:
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+    directory_data = cached(
+        "team_directory",
+        [request.query_params.get("search"), request.query_params.get("cursor"), limit],
+        ["team"],
+        lambda: team_directory_data(list(users), limit),
+    )
+    return Response(directory_data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_team_typeahead(request):
+    prefix, limit = team_typeahead_params(request.query_params)
+    typeahead_data = cached(
+        "team_typeahead",
+        [prefix, limit],
+        ["team"],
+        lambda: team_typeahead_data(team_typeahead_queryset(prefix, limit)),
+    )
+    return Response(typeahead_data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_notifications_list(request):
+    notices = notifications_queryset(request.user)
     serializer = NoticeSerializer(notices, many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -201,10 +355,24 @@ def activate_or_delete_user_profile(request, id):
                     {"status": False, "message": "You cannot delete this superuser."},
                     status=status.HTTP_403_FORBIDDEN,
                 )
-            user.delete()
+            # Deactivate now and purge the user's activities and memberships in
+            # the background, rather than cascading through them in this request.
+            with transaction.atomic():
+                User.objects.filter(id=user.id).update(
+                    is_active=False, updated_at=timezone.now()
+                )
+                Token.objects.filter(user=user).delete()
+                bump("team")
+                job = enqueue_job(
+                    "purge_user", created_by=request.user, user_id=str(user.id)
+                )
             return Response(
-                {"status": True, "message": "User deleted successfully"},
-                status=status.HTTP_200_OK,
+                {
+                    "status": True,
+                    "message": "User has been deactivated and will be deleted shortly.",
+                    "jobId": job.id,
+                },
+                status=status.HTTP_202_ACCEPTED,
             )
         except User.DoesNotExist:
             return Response(
@@ -235,6 +403,7 @@ def change_user_password(request):
 
 
 @api_view(["POST"])
+@idempotent
 def create_task(request):
     data = request.data
     serializer = CreateTaskSerializer(data=data, context={"request": request})
@@ -254,6 +423,7 @@ def create_task(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def duplicate_task(request, id):
     try:
         user_id = request.user.id
@@ -270,27 +440,31 @@ def duplicate_task(request, id):
             + f" The task priority is set a {task.priority} priority, so check and act accordingly. The task date is {task.date.strftime('%A %B %d, %Y')}. Thank you!!!"
         )
 
-        activity = Activity.objects.create(
-            type="assigned",
-            activity=text,
-            by_id=user_id,
-        )
+        with transaction.atomic():
+            activity = Activity.objects.create(
+                type="assigned",
+                activity=text,
+                by_id=user_id,
+            )
 
-        new_task = Task.objects.create(
-            title="Duplicate - " + task.title,
-            stage=task.stage,
-            date=task.date,
-            priority=task.priority,
-            assets=task.assets,
-        )
-        new_task.activities.add(activity)
-        new_task.team.set(task.team.all())
+            new_task = Task.objects.create(
+                title="Duplicate - " + task.title,
+                stage=task.stage,
+                date=task.date,
+                priority=task.priority,
+                assets=task.assets,
+            )
+            new_task.activities.add(activity)
+            new_task.team.set(task.team.all())
+            record_task_events(
+                [new_task.id], created_counts(new_task.stage, new_task.priority)
+            )
 
-        notice = Notice.objects.create(
-            text=text,
-            task=new_task,
-        )
-        notice.team.set(task.team.all())
+            notice = Notice.objects.create(
+                text=text,
+                task=new_task,
+            )
+            notice.team.set(task.team.all())
 
         return Response(
             {"status": True, "message": "Task duplicated successfully."},
@@ -308,9 +482,45 @@ def duplicate_task(request, id):
         )
 
 
-@api_view(["PUT"])
+def validate_task_choice(field_name, value):
+    choices = [choice for choice, _ in Task._meta.get_field(field_name).choices]
+    if value not in choices:
+        raise ValueError(f"Invalid {field_name} '{value}'.")
+    return value
+
+
+def sync_task_team(task_id, team):
+    """
+    Apply the difference between the stored team and ``team`` to the through
+    table. Returns True when the team changed.
+    """
+    TaskTeam = Task.team.through
+    current_ids = set(
+        TaskTeam.objects.filter(task_id=task_id).values_list("user_id", flat=True)
+    )
+    new_ids = {uuid.UUID(str(user_id)) for user_id in team}
+    if current_ids == new_ids:
+        return False
+
+    removed_ids = current_ids - new_ids
+    added_ids = new_ids - current_ids
+    if removed_ids:
+        TaskTeam.objects.filter(task_id=task_id, user_id__in=removed_ids).delete()
+        record_removals((task_id, user_id) for user_id in removed_ids)
+    if added_ids:
+        TaskTeam.objects.bulk_create(
+            [TaskTeam(task_id=task_id, user_id=user_id) for user_id in added_ids],
+            ignore_conflicts=True,
+        )
+    return True
+
+
+@api_view(["PUT", "PATCH"])
 @permission_classes([IsAuthenticated])
 def update_task(request, id):
+    if request.method == "PATCH":
+        return patch_task(request, id)
+
     try:
         title = request.data.get("title")
         date = request.data.get("date")
@@ -327,8 +537,69 @@ def update_task(request, id):
         task.assets = assets
         task.stage = stage
 
-        task.save()
-        task.team.set(team)
+        with transaction.atomic():
+            # Only the write that actually moves the task counts the move.
+            entered = (
+                Task.objects.filter(id=task.id).exclude(stage=stage).update(stage=stage)
+            )
+            task.save(
+                update_fields=["title", "date", "priority", "assets", "updated_at"]
+            )
+            sync_task_team(task.id, team)
+            if entered:
+                record_task_events([task.id], stage_counts(stage))
+
+        return Response(
+            {"status": True, "message": "Task updated successfully."},
+            status=status.HTTP_200_OK,
+        )
+    except ObjectDoesNotExist:
+        return Response(
+            {"status": False, "message": "Task not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    except Exception as e:
+        print(e)
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+def patch_task(request, id):
+    """
+    Write only the supplied fields with a single UPDATE, and touch the team
+    through table only when the team actually changed.
+    """
+    data = request.data
+    try:
+        fields = {}
+        for field_name in ("title", "date", "assets"):
+            if field_name in data:
+                fields[field_name] = data[field_name]
+        for field_name in ("stage", "priority"):
+            if field_name in data:
+                fields[field_name] = validate_task_choice(
+                    field_name, data[field_name].lower()
+                )
+
+        with transaction.atomic():
+            tasks = Task.objects.filter(id=id)
+            now = timezone.now()
+            # A stage change is written only where the stage differs, so its
+            # row count tells whether this write moved the task. Otherwise
+            # the UPDATE doubles as the existence check.
+            entered = 0
+            if "stage" in fields:
+                entered = tasks.exclude(stage=fields["stage"]).update(
+                    **fields, updated_at=now
+                )
+            if not entered and not tasks.update(**fields, updated_at=now):
+                raise Task.DoesNotExist
+            if "team" in data:
+                sync_task_team(id, data["team"])
+            if entered:
+                record_task_events([id], stage_counts(fields["stage"]))
+            bump("tasks", task_scope(id))
 
         return Response(
             {"status": True, "message": "Task updated successfully."},
@@ -350,13 +621,19 @@ def update_task(request, id):
 @permission_classes([IsAuthenticated])
 def update_task_stage(request, id):
     try:
-        stage = request.data.get("stage").lower()
-
-        task = Task.objects.get(id=id)
-
-        task.stage = stage
+        stage = validate_task_choice("stage", request.data.get("stage").lower())
 
-        task.save()
+        with transaction.atomic():
+            entered = (
+                Task.objects.filter(id=id)
+                .exclude(stage=stage)
+                .update(stage=stage, updated_at=timezone.now())
+            )
+            if entered:
+                record_task_events([id], stage_counts(stage))
+                bump("tasks", task_scope(id))
+            elif not Task.objects.filter(id=id).exists():
+                raise Task.DoesNotExist
 
         return Response(
             {"status": True, "message": "Task stage changed successfully."},
@@ -410,16 +687,14 @@ def create_subtask(request, id):
         )
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_tasks(request):
-    user_id = request.user.id
-    is_admin = request.user.is_superuser
-    stage = request.GET.get("stage")
-    is_trashed = request.GET.get("isTrashed") == "true"
-    search = request.GET.get("search")
+def task_list_queryset(user, params):
+    user_id = user.id
+    is_admin = user.is_superuser
+    stage = params.get("stage")
+    is_trashed = params.get("isTrashed") == "true"
+    search = params.get("search")
 
-    query = Q(is_trashed=is_trashed)
+    query = Q()
 
     if not is_admin:
         query &= Q(team__in=[user_id])
@@ -434,88 +709,68 @@ def get_tasks(request):
         )
         query &= search_query
 
-    tasks = Task.objects.filter(query).order_by("-id")
+    tasks_manager = Task.trashed if is_trashed else Task.objects
+    return tasks_manager.filter(query).prefetch_related("activities").order_by("-id")
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_tasks(request):
+    tasks = load_task_people(task_list_queryset(request.user, request.GET))
+
+    tasks_data = [task_data(task) for task in tasks]
+
+    return Response({"status": True, "tasks": tasks_data}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_trashed_tasks(request):
+    """
+    Lightweight trash listing served from the partial index on trashed tasks.
+    """
+    tasks = Task.trashed.order_by("-updated_at")
+    if not request.user.is_superuser:
+        tasks = tasks.filter(team__in=[request.user.id])
 
     tasks_data = [
         {
-            "id": task.id,
-            "_id": task.id,
-            "title": task.title,
-            "stage": task.stage,
-            "priority": task.priority,
-            "subTasks": task.sub_tasks,
-            "assets": task.assets,
-            "date": task.date.strftime("%Y-%m-%d"),
-            "team": [
-                {
-                    "id": member.id,
-                    "_id": member.id,
-                    "name": member.name,
-                    "title": member.title,
-                    "role": member.role,
-                    "email": member.email,
-                }
-                for member in task.team.all()
-            ],
-            "activities": [
-                {
-                    "id": activity.id,
-                    "_id": activity.id,
-                    "type": activity.type,
-                    "activity": activity.activity,
-                    "by": activity.by.name,
-                    "date": activity.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-                for activity in task.activities.all()
-            ],
+            "id": task["id"],
+            "_id": task["id"],
+            "title": task["title"],
+            "stage": task["stage"],
+            "priority": task["priority"],
+            "date": task["date"].strftime("%Y-%m-%d"),
+            "trashedAt": task["updated_at"],
         }
-        for task in tasks
+        for task in tasks.values(
+            "id", "title", "stage", "priority", "date", "updated_at"
+        )
     ]
 
     return Response({"status": True, "tasks": tasks_data}, status=status.HTTP_200_OK)
 
 
+def task_detail_data(id):
+    task = Task.all_objects.prefetch_related("activities").get(id=id)
+    load_task_people([task])
+    return task_data(task, include_activity_dates=False)
+
+
 @api_view(["GET", "PUT"])
 @permission_classes([IsAuthenticated])
 def get_or_trash_task(request, id):
     if request.method == "GET":
         try:
-            task = Task.objects.get(id=id)
-
-            task_data = {
-                "id": task.id,
-                "_id": task.id,
-                "title": task.title,
-                "stage": task.stage,
-                "priority": task.priority,
-                "subTasks": task.sub_tasks,
-                "assets": task.assets,
-                "date": task.date.strftime("%Y-%m-%d"),
-                "team": [
-                    {
-                        "id": member.id,
-                        "_id": member.id,
-                        "name": member.name,
-                        "title": member.title,
-                        "role": member.role,
-                        "email": member.email,
-                    }
-                    for member in task.team.all()
-                ],
-                "activities": [
-                    {
-                        "id": activity.id,
-                        "_id": activity.id,
-                        "type": activity.type,
-                        "activity": activity.activity,
-                        "by": activity.by.name,
-                    }
-                    for activity in task.activities.all()
-                ],
-            }
+            task_payload = cached(
+                "task",
+                [id],
+                [task_scope(id), "team"],
+                lambda: task_detail_data(id),
+            )
 
             return Response(
-                {"status": True, "task": task_data}, status=status.HTTP_200_OK
+                {"status": True, "task": task_payload}, status=status.HTTP_200_OK
             )
         except ObjectDoesNotExist:
             return Response(
@@ -530,7 +785,7 @@ def get_or_trash_task(request, id):
             )
 
         try:
-            task = Task.objects.get(id=id)
+            task = Task.all_objects.get(id=id)
         except ObjectDoesNotExist:
             return Response(
                 {"status": False, "message": "Task not found"},
@@ -549,6 +804,7 @@ def get_or_trash_task(request, id):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def post_task_activity(request, id):
     user_id = request.user.id
     type = request.data.get("type")
@@ -583,11 +839,18 @@ def delete_restore_task(request, id):
 
     try:
         if action_type == "delete":
-            Task.objects.get(id=id).delete()
+            with transaction.atomic():
+                task = Task.all_objects.get(id=id)
+                record_tombstones([id])
+                task.delete()
+                bump("tasks", task_scope(id))
         elif action_type == "restore":
-            task = Task.objects.get(id=id)
-            task.is_trashed = False
-            task.save()
+            restored = Task.all_objects.filter(id=id).update(
+                is_trashed=False, updated_at=timezone.now()
+            )
+            if not restored:
+                raise Task.DoesNotExist
+            bump("tasks", task_scope(id))
 
         return Response(
             {"status": True, "message": "Operation performed successfully."},
@@ -607,9 +870,18 @@ def delete_restore_all_tasks(request):
 
     try:
         if action_type == "deleteAll":
-            Task.objects.filter(is_trashed=True).delete()
+            job = enqueue_job("purge_trashed_tasks", created_by=request.user)
+            return Response(
+                {
+                    "status": True,
+                    "message": "Deletion of trashed tasks has started.",
+                    "jobId": job.id,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
         elif action_type == "restoreAll":
-            Task.objects.filter(is_trashed=True).update(is_trashed=False)
+            Task.trashed.update(is_trashed=False, updated_at=timezone.now())
+            bump("tasks")
 
         return Response(
             {"status": True, "message": "Operation performed successfully."},
@@ -624,94 +896,237 @@ def delete_restore_all_tasks(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def dashboard_statistics(request):
-    user_id = request.user.id
-    is_admin = request.user.is_superuser
-
+def get_job_status(request, id):
     try:
-        if is_admin:
-            all_tasks = Task.objects.filter(is_trashed=False).order_by("-id")
-        else:
-            all_tasks = Task.objects.filter(
-                is_trashed=False, team__id=user_id
-            ).order_by("-id")
+        job = Job.objects.get(id=id)
+    except ObjectDoesNotExist:
+        return Response(
+            {"status": False, "message": "Job not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    if not request.user.is_superuser and job.created_by_id != request.user.id:
+        return Response(
+            {"status": False, "message": "Permission denied."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    serializer = JobSerializer(job)
+    return Response({"status": True, "job": serializer.data}, status=status.HTTP_200_OK)
+
+
+STAGE_ACTIVITY_TYPES = {
+    "todo": "commented",
+    "in progress": "in progress",
+    "completed": "completed",
+}
 
-        users = User.objects.filter(is_active=True).values(
-            "name", "title", "role", "is_active", "created_at"
-        )[:10]
 
-        raw_grouped_tasks = (
-            all_tasks.values("stage").annotate(count=Count("stage")).order_by("stage")
+def bulk_update_tasks(
+    request, tasks_manager, values, admin_only, activity_type, activity_text
+):
+    """
+    Apply ``values`` to the requested tasks with one set-based UPDATE, whose
+    WHERE clause also checks the permission, and log a single activity
+    against every task that changed. Returns the per-id outcome of the
+    operation.
+    """
+    user = request.user
+    is_admin = user.is_superuser
+    ids = request.data.get("ids")
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return Response(
+            {"status": False, "message": "'ids' must be a list of task ids."},
+            status=status.HTTP_400_BAD_REQUEST,
         )
-        grouped_tasks = {task["stage"]: task["count"] for task in raw_grouped_tasks}
+    results = {}
+    requested_ids = []
+    for task_id in ids:
+        try:
+            requested_ids.append(uuid.UUID(task_id))
+        except ValueError:
+            results[task_id] = "invalid"
 
-        raw_graph_data = (
-            all_tasks.values("priority")
-            .annotate(total=Count("priority"))
-            .order_by("priority")
+    is_member = Exists(
+        Task.team.through.objects.filter(task_id=OuterRef("pk"), user_id=user.id)
+    )
+    # The UPDATE stamps the rows it changes with this exact time, which tells
+    # them apart in the SELECT that follows it.
+    now = timezone.now()
+    with transaction.atomic():
+        updated = 0
+        if is_admin or not admin_only:
+            allowed = tasks_manager.filter(id__in=requested_ids)
+            if not is_admin:
+                allowed = allowed.filter(is_member)
+            updated = allowed.exclude(**values).update(**values, updated_at=now)
+
+        tasks = (
+            tasks_manager.filter(id__in=requested_ids)
+            .annotate(is_member=is_member)
+            .values("id", "is_member", "updated_at")
         )
-        graph_data = [
-            {"name": data["priority"], "total": data["total"]}
-            for data in raw_graph_data
-        ]
+        found = {task["id"]: task for task in tasks}
+
+        update_ids = []
+        for task_id in requested_ids:
+            task = found.get(task_id)
+            if task is None:
+                results[str(task_id)] = "not_found"
+            elif updated and task["updated_at"] == now:
+                results[str(task_id)] = "updated"
+                update_ids.append(task_id)
+            elif not is_admin and (admin_only or not task["is_member"]):
+                results[str(task_id)] = "forbidden"
+            else:
+                results[str(task_id)] = "unchanged"
+
+        if update_ids:
+            activity = Activity.objects.create(
+                type=activity_type,
+                activity=activity_text.format(count=len(update_ids)),
+                by_id=user.id,
+            )
+            TaskActivity = Task.activities.through
+            TaskActivity.objects.bulk_create(
+                [
+                    TaskActivity(task_id=task_id, activity_id=activity.id)
+                    for task_id in update_ids
+                ]
+            )
+            if "stage" in values:
+                # Tasks already in the stage were left out as unchanged.
+                record_task_events(update_ids, stage_counts(values["stage"]))
+            bump("tasks", *(task_scope(task_id) for task_id in update_ids))
 
-        total_tasks = all_tasks.count()
-        last_10_tasks = all_tasks[:10]
+    return Response(
+        {
+            "status": True,
+            "message": "Operation performed successfully.",
+            "updated": len(update_ids),
+            "results": results,
+        },
+        status=status.HTTP_200_OK,
+    )
 
-        last_10_tasks_data = [
-            {
-                "id": task.id,
-                "_id": task.id,
-                "title": task.title,
-                "stage": task.stage,
-                "priority": task.priority,
-                "subTasks": task.sub_tasks,
-                "assets": task.assets,
-                "date": task.date.strftime("%Y-%m-%d"),
-                "team": [
-                    {
-                        "id": member.id,
-                        "_id": member.id,
-                        "name": member.name,
-                        "title": member.title,
-                        "role": member.role,
-                        "email": member.email,
-                    }
-                    for member in task.team.all()
-                ],
-                "activities": [
-                    {
-                        "id": activity.id,
-                        "_id": activity.id,
-                        "type": activity.type,
-                        "activity": activity.activity,
-                        "by": activity.by.name,
-                        "date": activity.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    }
-                    for activity in task.activities.all()
-                ],
-            }
-            for task in last_10_tasks
-        ]
 
-        users_data = [
-            {
-                "name": user["name"],
-                "title": user["title"],
-                "role": user["role"],
-                "isActive": user["is_active"],
-                "createdAt": user["created_at"],
-            }
-            for user in users
-        ]
-
-        summary = {
-            "totalTasks": total_tasks,
-            "last10Task": last_10_tasks_data,
-            "users": users_data if is_admin else [],
-            "tasks": grouped_tasks,
-            "graphData": graph_data,
-        }
+@api_view(["PUT"])
+@permission_classes([IsAuthenticated])
+def bulk_update_task_stage(request):
+    try:
+        stage = validate_task_choice("stage", request.data.get("stage").lower())
+    except Exception as e:
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return bulk_update_tasks(
+        request,
+        Task.objects,
+        {"stage": stage},
+        admin_only=False,
+        activity_type=STAGE_ACTIVITY_TYPES[stage],
+        activity_text=f"Moved {{count}} task(s) to {stage}.",
+    )
+
+
+@api_view(["PUT"])
+@permission_classes([IsAuthenticated])
+def bulk_trash_tasks(request):
+    return bulk_update_tasks(
+        request,
+        Task.all_objects,
+        {"is_trashed": True},
+        admin_only=True,
+        activity_type="commented",
+        activity_text="Moved {count} task(s) to trash.",
+    )
+
+
+@api_view(["PUT"])
+@permission_classes([IsAuthenticated])
+def bulk_restore_tasks(request):
+    return bulk_update_tasks(
+        request,
+        Task.all_objects,
+        {"is_trashed": False},
+        admin_only=True,
+        activity_type="commented",
+        activity_text="Restored {count} task(s) from trash.",
+    )
+
+
+def dashboard_tasks_queryset(user):
+    if user.is_superuser:
+        return Task.objects.order_by("-id")
+    return Task.objects.filter(team__id=user.id).order_by("-id")
+
+
+def dashboard_users_queryset():
+    return User.objects.filter(is_active=True).values(
+        "name", "title", "role", "is_active", "created_at"
+    )[:10]
+
+
+def dashboard_user_data(user):
+    return {
+        "name": user["name"],
+        "title": user["title"],
+        "role": user["role"],
+        "isActive": user["is_active"],
+        "createdAt": user["created_at"],
+    }
+
+
+def dashboard_summary(user):
+    is_admin = user.is_superuser
+
+    all_tasks = dashboard_tasks_queryset(user)
+
+    users = dashboard_users_queryset()
+
+    raw_grouped_tasks = (
+        all_tasks.values("stage").annotate(count=Count("stage")).order_by("stage")
+    )
+    grouped_tasks = {task["stage"]: task["count"] for task in raw_grouped_tasks}
+
+    raw_graph_data = (
+        all_tasks.values("priority")
+        .annotate(total=Count("priority"))
+        .order_by("priority")
+    )
+    graph_data = [
+        {"name": data["priority"], "total": data["total"]} for data in raw_graph_data
+    ]
+
+    total_tasks = all_tasks.count()
+    last_10_tasks = load_task_people(all_tasks.prefetch_related("activities")[:10])
+
+    last_10_tasks_data = [task_data(task) for task in last_10_tasks]
+
+    users_data = (
+        [dashboard_user_data(active_user) for active_user in users] if is_admin else []
+    )
+
+    return {
+        "totalTasks": total_tasks,
+        "last10Task": last_10_tasks_data,
+        "users": users_data,
+        "tasks": grouped_tasks,
+        "graphData": graph_data,
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def dashboard_statistics(request):
+    try:
+        summary = cached(
+            "dashboard",
+            [request.user.id],
+            ["tasks", "team"],
+            lambda: dashboard_summary(request.user),
+        )
 
         return Response(
             {"status": True, **summary, "message": "Successfully."},
@@ -721,3 +1136,351 @@ def dashboard_statistics(request):
         return Response(
             {"status": False, "message": str(error)}, status=status.HTTP_400_BAD_REQUEST
         )
+
+
+def workload_queryset(user):
+    """
+    Open task counts per (member, stage, priority), in one GROUP BY over the
+    task team through table.
+    """
+    assignments = Task.team.through.objects.filter(task__is_trashed=False).exclude(
+        task__stage="completed"
+    )
+    if not user.is_superuser:
+        assignments = assignments.filter(user_id=user.id)
+    return (
+        assignments.values("user_id", "task__stage", "task__priority")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+
+
+def workload_data(user):
+    workloads = {}
+    for row in workload_queryset(user):
+        workload = workloads.setdefault(
+            row["user_id"], {"total": 0, "stages": {}, "priorities": {}, "counts": {}}
+        )
+        stage, priority, count = row["task__stage"], row["task__priority"], row["count"]
+        workload["total"] += count
+        workload["stages"][stage] = workload["stages"].get(stage, 0) + count
+        workload["priorities"][priority] = (
+            workload["priorities"].get(priority, 0) + count
+        )
+        workload["counts"].setdefault(stage, {})[priority] = count
+
+    user_directory.ensure(workloads)
+    members = [
+        {**team_member_data(member), **workloads[member.id]}
+        for member in user_directory.get_many(workloads)
+    ]
+    members.sort(key=lambda member: (-member["total"], member["name"]))
+    return {"status": True, "members": members}
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_task_changes(request):
+    """
+    The tasks changed since the ``since`` cursor of the previous call, and
+    a new cursor. Without ``since``, every task.
+    """
+    since = request.query_params.get("since")
+    try:
+        since = decode_sync_cursor(since) if since else None
+    except InvalidCursor as e:
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+    except CursorExpired as e:
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_410_GONE
+        )
+    return Response(task_changes(request.user, since), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_workload(request):
+    """
+    Each member's open tasks by stage and priority; only your own unless you
+    are an admin.
+    """
+    workload = cached(
+        "workload",
+        [None if request.user.is_superuser else request.user.id],
+        ["tasks", "team"],
+        lambda: workload_data(request.user),
+    )
+    return Response(workload, status=status.HTTP_200_OK)
+
+
+def activity_feed_queryset(user, params):
+    """
+    One page of the activities on the user's live tasks (every live task for
+    admins), newest first, plus the page size. One extra row is fetched to
+    tell whether there is a next page.
+
+    A member's feed joins from their team rows to their tasks' activities,
+    so only those rows are sorted. Most activities are on some live task,
+    so an admin's feed walks the activity index instead and stops at the
+    page.
+    """
+    limit = page_size(
+        params.get("limit"), ACTIVITY_FEED_PAGE_SIZE, ACTIVITY_FEED_MAX_PAGE_SIZE
+    )
+    if user.is_superuser:
+        activities = Activity.objects.filter(
+            Exists(
+                Task.activities.through.objects.filter(
+                    activity_id=OuterRef("pk"), task__is_trashed=False
+                )
+            )
+        )
+    else:
+        # An activity on several of the user's tasks is joined once per task.
+        activities = Activity.objects.filter(
+            task__team=user.id, task__is_trashed=False
+        ).distinct()
+    activities = activities.order_by("-created_at", "-id")
+
+    since = params.get("since")
+    if since:
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            raise InvalidCursor("Invalid since.")
+        activities = activities.filter(created_at__gte=since)
+
+    cursor = params.get("cursor")
+    if cursor:
+        created_at, activity_id = decode_cursor(cursor, 2)
+        if not isinstance(created_at, str) or not isinstance(activity_id, str):
+            raise InvalidCursor("Invalid cursor.")
+        try:
+            created_at = parse_datetime(created_at)
+            activity_id = uuid.UUID(activity_id)
+        except ValueError:
+            raise InvalidCursor("Invalid cursor.")
+        if created_at is None:
+            raise InvalidCursor("Invalid cursor.")
+        activities = activities.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=activity_id)
+        )
+    return activities[: limit + 1], limit
+
+
+def activity_feed_data(activities, limit):
+    next_cursor = None
+    if len(activities) > limit:
+        activities = activities[:limit]
+        # isoformat() keeps the microseconds DjangoJSONEncoder would drop.
+        last = activities[-1]
+        next_cursor = encode_cursor([last.created_at.isoformat(), last.id])
+
+    activity_ids = [activity.id for activity in activities]
+    tasks = {}
+    for activity_id, task_id, title in Task.activities.through.objects.filter(
+        activity_id__in=activity_ids, task__is_trashed=False
+    ).values_list("activity_id", "task_id", "task__title"):
+        tasks.setdefault(activity_id, []).append({"id": task_id, "title": title})
+    user_directory.ensure({activity.by_id for activity in activities})
+
+    return {
+        "status": True,
+        "activities": [
+            {
+                "id": activity.id,
+                "_id": activity.id,
+                "type": activity.type,
+                "activity": activity.activity,
+                "by": user_directory.name(activity.by_id),
+                "byId": activity.by_id,
+                "date": activity.created_at,
+                "tasks": tasks.get(activity.id, []),
+            }
+            for activity in activities
+        ],
+        "nextCursor": next_cursor,
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_activity_feed(request):
+    try:
+        activities, limit = activity_feed_queryset(request.user, request.query_params)
+    except InvalidCursor as e:
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(
+        activity_feed_data(list(activities), limit), status=status.HTTP_200_OK
+    )
+
+
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_MAX_DAYS = 366
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_task_analytics(request):
+    """
+    Daily task counters between ``from`` and ``to`` (inclusive, ISO dates),
+    read from the rollups. Admins get all tasks, or one member's with
+    ``user``; everyone else gets their own.
+    """
+    user = request.user
+    try:
+        end = (
+            date.fromisoformat(request.GET["to"])
+            if "to" in request.GET
+            else timezone.localdate()
+        )
+        start = (
+            date.fromisoformat(request.GET["from"])
+            if "from" in request.GET
+            else end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+        )
+        user_id = uuid.UUID(request.GET["user"]) if "user" in request.GET else None
+    except ValueError as e:
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+    if not start <= end or (end - start).days >= ANALYTICS_MAX_DAYS:
+        return Response(
+            {
+                "status": False,
+                "message": f"The range must span 1 to {ANALYTICS_MAX_DAYS} days.",
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if not user.is_superuser:
+        if user_id not in (None, user.id):
+            return Response(
+                {"status": False, "message": "Permission denied."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        user_id = user.id
+
+    return Response(
+        {
+            "status": True,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "user": user_id,
+            "days": rollup_series(user_id, start, end),
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_tasks(request, export_format):
+    """
+    Stream every task created in ``[from, to)`` as CSV or NDJSON, gzipped
+    with ``gzip=1``. Pass the id of the last task received as ``after`` to
+    resume an interrupted export.
+    """
+    if not request.user.is_superuser:
+        return Response(
+            {"status": False, "message": "Permission denied."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return Response(
+            {"status": False, "message": f"Unknown export format '{export_format}'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    params = request.GET
+    try:
+        tasks = export_queryset(
+            start=parse_export_datetime(params["from"]) if "from" in params else None,
+            end=parse_export_datetime(params["to"]) if "to" in params else None,
+            after=uuid.UUID(params["after"]) if "after" in params else None,
+        )
+    except ValueError as e:
+        return Response(
+            {"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+    except Task.DoesNotExist:
+        return Response(
+            {"status": False, "message": "Task not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    compress = params.get("gzip") in ("1", "true")
+    filename = f"tasks.{export_format}" + (".gz" if compress else "")
+    response = StreamingHttpResponse(
+        export_chunks(export_format, tasks, compress=compress),
+        content_type=(
+            "application/gzip" if compress else EXPORT_CONTENT_TYPES[export_format]
+        ),
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def import_tasks(request, import_format):
+    """
+    Import tasks from an uploaded CSV or NDJSON ``file``, in the export's
+    format. ``notify=0`` skips the notices to the imported teams. Responds
+    with the import report, listing the rows that were skipped.
+    """
+    if not request.user.is_superuser:
+        return Response(
+            {"status": False, "message": "Permission denied."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    if import_format not in IMPORT_FORMATS:
+        return Response(
+            {"status": False, "message": f"Unknown import format '{import_format}'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response(
+            {"status": False, "message": "Upload the tasks as 'file'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    report = import_task_records(
+        import_format,
+        upload,
+        request.user,
+        notify=request.query_params.get("notify") not in ("0", "false"),
+    )
+    return Response(
+        {
+            "status": True,
+            "message": f"Imported {report.imported} of {report.rows} task(s).",
+            **report.as_dict(),
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+def metrics(request):
+    """
+    Request and database metrics in the Prometheus text format, of every
+    worker process when ``METRICS_DIR`` is set. Requires ``METRICS_TOKEN``
+    unless DEBUG is on.
+    """
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+    elif not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,112 @@
+"""
+Warm-up of the lazily built parts of the app, so the first requests after a
+worker boots don't pay for them. ``preload`` runs when the ASGI/WSGI
+application is imported; with gunicorn's ``preload_app`` (see
+gunicorn.conf.py) that is once in the master, before the workers fork and
+share its memory. ``warm_worker`` runs in each worker after the fork and
+opens its database connections.
+"""
+
+import logging
+import time
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from .metrics import (
+    APP_IMPORT_SECONDS,
+    WORKER_FIRST_REQUEST_SECONDS,
+    WORKER_WARMUP_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_first_request_recorded = False
+
+
+def warm_url_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        # The compiled regex is a cached property built on first use.
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            warm_url_patterns(pattern)
+
+
+def preload(started):
+    """
+    Build the URL resolver, DRF settings, model metadata and serializer
+    fields, and load the translation catalog. Nothing here touches the
+    database, so it is safe to run before forking. ``started`` is the
+    ``time.perf_counter()`` value taken before the application was imported.
+    """
+    from . import async_views, serializers as app_serializers, views  # noqa: F401
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+    warm_url_patterns(resolver)
+
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PARSER_CLASSES
+    api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    api_settings.DEFAULT_PERMISSION_CLASSES
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+    for serializer_class in vars(app_serializers).values():
+        if (
+            isinstance(serializer_class, type)
+            and issubclass(serializer_class, serializers.ModelSerializer)
+            and serializer_class.__module__ == app_serializers.__name__
+            and hasattr(serializer_class, "Meta")
+        ):
+            serializer_class().fields
+
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext("Invalid token.")
+
+    import_seconds = time.perf_counter() - started
+    APP_IMPORT_SECONDS.set(import_seconds)
+    logger.info("Application imported and preloaded in %.3fs", import_seconds)
+
+
+def warm_worker():
+    """
+    Open this worker's database connections, or its connection pools, so the
+    first request doesn't wait for a connect and TLS handshake, and load the
+    user directory. Without a pool the connection is kept open for this
+    thread, which serves the requests of sync workers, until CONN_MAX_AGE.
+    """
+    from .directory import user_directory
+
+    started = time.perf_counter()
+    try:
+        user_directory.refresh()
+    except DatabaseError as e:
+        logger.warning("Could not load the user directory: %s", e)
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except DatabaseError as e:
+            logger.warning("Could not warm up database %r: %s", connection.alias, e)
+        finally:
+            # Hands a pooled connection back to the pool. Closing one that
+            # isn't pooled would throw the warm-up away.
+            if getattr(connection, "pool", None) is not None:
+                connection.close()
+
+    warmup_seconds = time.perf_counter() - started
+    WORKER_WARMUP_SECONDS.set(warmup_seconds)
+    logger.info("Worker warmed up in %.3fs", warmup_seconds)
+
+
+def record_first_request(duration):
+    global _first_request_recorded
+    if _first_request_recorded:
+        return
+    _first_request_recorded = True
+    WORKER_FIRST_REQUEST_SECONDS.set(duration)
+    logger.info("First request handled in %.3fs", duration)
@@ -0,0 +1,31 @@
+# Gunicorn reads this file from the working directory on startup.
+
+import os
+
+# Import the application once in the master, warmed up by app.warmup.preload,
+# and fork the workers from it.
+preload_app = True
+
+# The workers share their metrics through files in this directory (see
+# app.metrics).
+metrics_dir = os.getenv("METRICS_DIR")
+
+
+def on_starting(server):
+    if metrics_dir:
+        from app.metrics import clear_directory
+
+        clear_directory(metrics_dir)
+
+
+def post_fork(server, worker):
+    from app.warmup import warm_worker
+
+    warm_worker()
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from app.metrics import mark_process_dead
+
+        mark_process_dead(metrics_dir, worker.pid)
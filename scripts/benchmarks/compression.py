@@ -0,0 +1,63 @@
+"""
+Compressed size and CPU cost of the API's JSON responses at the Brotli and
+gzip levels CompressionMiddleware could use. Renders each endpoint once, as
+the seeded admin, then times compressing the whole body in-process.
+
+    DEBUG=True python scripts/benchmarks/seed.py      # prints TOKEN
+    DEBUG=True python scripts/benchmarks/compression.py --token TOKEN
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from pathlib import Path
+
+import brotli
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task-management-system.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import Client  # noqa: E402
+
+PATHS = ["/api/task", "/api/task/dashboard"]
+
+CODECS = {
+    "br4": (lambda body: brotli.compress(body, quality=4), 200),
+    "br11": (lambda body: brotli.compress(body, quality=11), 20),
+    "gzip6": (lambda body: gzip.compress(body, 6), 200),
+    "gzip1": (lambda body: gzip.compress(body, 1), 200),
+}
+
+
+def median_ms(compress, body, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compressed = compress(body)
+        times.append(time.perf_counter() - start)
+    return len(compressed), sorted(times)[repeat // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--token", required=True)
+    args = parser.parse_args()
+    client = Client(
+        HTTP_AUTHORIZATION=f"Token {args.token}", HTTP_ACCEPT_ENCODING="identity"
+    )
+    for path in PATHS:
+        body = client.get(path).content
+        print(f"{path} ({len(body):,} bytes):")
+        for name, (compress, repeat) in CODECS.items():
+            size, elapsed = median_ms(compress, body, repeat)
+            print(f"  {name}: {size:,} bytes, {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
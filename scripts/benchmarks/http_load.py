@@ -0,0 +1,71 @@
+"""
+Closed-loop HTTP load generator: ``--concurrency`` keep-alive connections
+each send GET requests back to back for ``--seconds``, then the throughput
+and latency percentiles are printed. Used to compare the sync DRF views with
+the native async ones (``ASYNC_READ_VIEWS``) under the uvicorn worker:
+
+    DEBUG=True python scripts/benchmarks/seed.py      # prints TOKEN, TASK_ID
+    DEBUG=True QUERY_BUDGET_MODE=off SERVER_TIMING=False ASYNC_READ_VIEWS=True \\
+        python -m uvicorn task-management-system.asgi:application --port 8765 \\
+        --no-access-log
+    python scripts/benchmarks/http_load.py /api/task/TASK_ID --token TOKEN
+
+then again with ``ASYNC_READ_VIEWS=False``. Responses are requested
+uncompressed, so compression isn't part of the measurement.
+"""
+
+import argparse
+import asyncio
+import time
+
+
+async def client(args, deadline, results):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    request = (
+        f"GET {args.path} HTTP/1.1\r\nHost: {args.host}\r\n"
+        f"Authorization: Token {args.token}\r\nAccept-Encoding: identity\r\n\r\n"
+    ).encode()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        status = int(head.split(b" ", 2)[1])
+        results.append((status, time.perf_counter() - start))
+    writer.close()
+
+
+async def run(args):
+    results = []
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        *(client(args, deadline, results) for _ in range(args.concurrency))
+    )
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    print(
+        f"{args.path} c={args.concurrency}: {len(results) / args.seconds:.0f} req/s, "
+        f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms, "
+        f"non-200 {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Seed an empty database for the HTTP benchmarks: an admin, 10 members and 50
+tasks, each with 3 members and 3 activities of random words. Prints the
+admin's auth token and the id of the last task.
+
+    DEBUG=True python manage.py migrate
+    DEBUG=True python scripts/benchmarks/seed.py
+
+With DEBUG=True the app uses db.sqlite3; point it at a throwaway database.
+"""
+
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task-management-system.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.authtoken.models import Token  # noqa: E402
+from app.models import Activity, Task, User  # noqa: E402
+
+MEMBERS = 10
+TASKS = 50
+
+
+def main():
+    if User.objects.exists():
+        sys.exit("The database already has users; seed an empty one.")
+    rng = random.Random(0)
+    words = [
+        "".join(
+            rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))
+        )
+        for _ in range(5000)
+    ]
+
+    admin = User.objects.create_superuser(
+        email="admin@example.com",
+        password="password",
+        name="Admin",
+        title="Admin",
+        role="Admin",
+    )
+    members = [
+        User.objects.create_user(
+            email=f"member{i}@example.com",
+            password="password",
+            name=f"Member {i}",
+            title="Developer",
+            role="Developer",
+        )
+        for i in range(MEMBERS)
+    ]
+    for i in range(TASKS):
+        task = Task.objects.create(title=f"Task {i}")
+        task.team.set(members[i % MEMBERS : i % MEMBERS + 3])
+        for member in members[:3]:
+            task.activities.add(
+                Activity.objects.create(
+                    type="commented",
+                    activity=" ".join(rng.choice(words) for _ in range(14)),
+                    by=member,
+                )
+            )
+
+    print(Token.objects.create(user=admin).key)
+    print(task.id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Insert and range-scan cost of random (uuid4) vs time-ordered (uuid7) primary
+keys, on a SQLite table shaped like the app's: a char(32) UUID key, as
+Django stores UUIDField on SQLite, and the page cache capped below the size
+of the index so inserts pay for the pages they touch.
+
+    python scripts/benchmarks/uuid_keys.py [--rows 1000000]
+
+Each row gets an id for its own millisecond, ending now. Reported per key
+type: the insert time in 1000-row transactions, the newest 50 rows by id,
+and the rows created in a 10 s window (by key range for uuid7; uuid4 ids say
+nothing about time, so that falls back to an unindexed created_at scan).
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.ids import uuid7  # noqa: E402
+
+BATCH_SIZE = 1000
+WINDOW_MS = 10_000
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def run(name, make_id, rows, directory):
+    path = os.path.join(directory, f"{name}.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA cache_size=-8000")
+    db.execute(
+        "CREATE TABLE task (id char(32) NOT NULL PRIMARY KEY, created_at real, "
+        "title text)"
+    )
+    first_ms = time.time_ns() // 1_000_000 - rows
+
+    start = time.perf_counter()
+    for batch_start in range(0, rows, BATCH_SIZE):
+        db.executemany(
+            "INSERT INTO task VALUES (?, ?, ?)",
+            [
+                (make_id(first_ms + i).hex, (first_ms + i) / 1000, "Task")
+                for i in range(batch_start, min(batch_start + BATCH_SIZE, rows))
+            ],
+        )
+        db.commit()
+    insert_seconds = time.perf_counter() - start
+
+    _, newest_ms = timed(
+        lambda: db.execute("SELECT id FROM task ORDER BY id DESC LIMIT 50").fetchall(),
+        200,
+    )
+    window_start = first_ms + rows // 2
+    if name == "uuid7":
+        query = "SELECT id FROM task WHERE id BETWEEN ? AND ?"
+        bounds = (uuid7(window_start).hex, uuid7(window_start + WINDOW_MS).hex)
+    else:
+        query = "SELECT id FROM task WHERE created_at BETWEEN ? AND ?"
+        bounds = (window_start / 1000, (window_start + WINDOW_MS) / 1000)
+    window_rows, window_ms = timed(
+        lambda: len(db.execute(query, bounds).fetchall()), 20
+    )
+    db.close()
+
+    print(
+        f"{name}: insert {rows:,} rows in {insert_seconds:.1f} s "
+        f"({rows / insert_seconds:,.0f} rows/s); newest 50 by id "
+        f"{newest_ms:.2f} ms; {WINDOW_MS // 1000} s window ({window_rows:,} rows) "
+        f"{window_ms:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        run("uuid4", lambda ms: uuid.uuid4(), args.rows, directory)
+        run("uuid7", uuid7, args.rows, directory)
+
+
+if __name__ == "__main__":
+    main()